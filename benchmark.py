@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark of the comparison strategies on synthetic Hebrew law titles.
+
+The corpora are generated from a fixed seed: titles built from law-title
+vocabulary, with Hebrew year suffixes (", התשנ"ה-1995"), plain year suffixes
+(", 1961"), "[נוסח חדש]" blocks, "(החדשות)" markers, and wiki variants with
+small typos. Every case runs in a fresh process, so its peak RSS is its own,
+and its results are checked against the original brute-force algorithm on a
+sample of queries ("parity"). Results are written to a JSON file.
+
+    python benchmark.py --sizes 10000,100000,1000000 --out benchmark_results.json
+
+Cases:
+  normalize.*        one normalizer of normalize.py over all system titles
+  existing           compare.py, first close system rule per wiki rule
+  best-match         compare.py --best-match, closest system rule per wiki rule
+  existing-blocking  compare.py --blocking; the parity shows the recall loss of blocking
+  missing-in-wiki    compare_fast.py, similarity of system rules to the wiki list
+  exact              compare_fixed.py, normalize_text and an exact set lookup
+
+For the matching cases the size is the size of the indexed side, and
+--queries lookups are timed against it.
+"""
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PREFIXES = ['חוק', 'חוק', 'חוק', 'תקנות', 'תקנות', 'פקודת', 'צו', 'חוק-יסוד:']
+WORDS = [
+    'הגנת', 'הצרכן', 'המכס', 'והבלו', 'מס', 'הכנסה', 'העונשין', 'התעבורה', 'הבנקאות', 'רישוי',
+    'שירותים', 'פיננסיים', 'הביטוח', 'הלאומי', 'בתי', 'המשפט', 'סדר', 'הדין', 'הפלילי', 'האזרחי',
+    'החברות', 'השותפויות', 'ניירות', 'ערך', 'התכנון', 'והבנייה', 'המקרקעין', 'הירושה', 'המתנה',
+    'השכירות', 'והשאילה', 'עבודת', 'נשים', 'נוער', 'שעות', 'ומנוחה', 'חופשה', 'שנתית', 'פיצויי',
+    'פיטורים', 'שכר', 'מינימום', 'הפרטיות', 'חופש', 'המידע', 'הרשויות', 'המקומיות', 'העיריות',
+    'המועצות', 'האזוריות', 'הבחירות', 'לכנסת', 'הממשלה', 'השיפוט', 'הצבאי', 'המשטרה', 'הסוהר',
+    'הרופאים', 'הרוקחים', 'בריאות', 'העם', 'זכויות', 'החולה', 'איכות', 'הסביבה', 'המים', 'החשמל',
+    'התקשורת', 'בזק', 'ושידורים', 'החינוך', 'הממלכתי', 'לימוד', 'חובה', 'ההגבלים', 'העסקיים',
+    'התחרות', 'הכלכלית', 'ההסדרים', 'במשק', 'המדינה', 'לתיקון', 'דיני', 'הראיות',
+]
+HEBREW_LETTERS = 'אבגדהוזחטיכלמנסעפצקרשת'
+_HUNDREDS = ['', 'ק', 'ר', 'ש', 'ת', 'תק', 'תר', 'תש', 'תת', 'תתק']
+_TENS = ['', 'י', 'כ', 'ל', 'מ', 'נ', 'ס', 'ע', 'פ', 'צ']
+_UNITS = ['', 'א', 'ב', 'ג', 'ד', 'ה', 'ו', 'ז', 'ח', 'ט']
+
+CASES = ['normalize.clean_keys', 'normalize.strip_system_suffixes', 'normalize.normalize_text',
+         'normalize.clean_comma_suffixed_key', 'existing', 'best-match', 'existing-blocking', 'missing-in-wiki',
+         'exact']
+
+
+def hebrew_year(year: int) -> str:
+    """Return the Hebrew year of a Gregorian year as written in law titles, e.g. 1995 -> התשנ"ה."""
+    value = (year + 3760) % 1000
+    tens, units = divmod(value % 100, 10)
+    if tens == 1 and units in (5, 6):
+        # 15 and 16 are written ט"ו and ט"ז
+        letters = _HUNDREDS[value // 100] + 'ט' + _UNITS[units + 1]
+    else:
+        letters = _HUNDREDS[value // 100] + _TENS[tens] + _UNITS[units]
+    return 'ה' + letters[:-1] + '"' + letters[-1]
+
+
+def random_title(rng: random.Random) -> str:
+    """Return one synthetic law title with one of the suffix styles of the real lists."""
+    title = rng.choice(PREFIXES) + ' ' + ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+    if rng.random() < 0.1:
+        title += f" (תיקון מס' {rng.randint(2, 40)})"
+    if rng.random() < 0.05:
+        title += ' (החדשות)'
+    style = rng.random()
+    year = rng.randint(1921, 2024)
+    if style < 0.6:
+        title += f", {hebrew_year(year)}-{year}"
+    elif style < 0.7:
+        title += f", {year}"
+    if rng.random() < 0.08:
+        title += ' [נוסח חדש]'
+    return title
+
+
+def add_typos(rng: random.Random, text: str, count: int) -> str:
+    """Apply count random letter substitutions, deletions or insertions."""
+    for _ in range(count):
+        position = rng.randrange(len(text))
+        edit = rng.random()
+        if edit < 0.4:
+            text = text[:position] + rng.choice(HEBREW_LETTERS) + text[position + 1:]
+        elif edit < 0.7:
+            text = text[:position] + text[position + 1:]
+        else:
+            text = text[:position] + rng.choice(HEBREW_LETTERS) + text[position:]
+    return text
+
+
+def generate_corpus(size: int, seed: int = 0) -> Tuple[List[str], List[str]]:
+    """Return (wiki titles, system records) of the given size.
+
+    System records are "<id>*^*<title>" like the lawdata endpoint. The wiki
+    list reuses the system titles, 60% unchanged, 25% with one or two typos
+    and 15% replaced by titles the system does not have, in shuffled order.
+    """
+    rng = random.Random(seed)
+    titles = [random_title(rng) for _ in range(size)]
+    system_records = [f"{i}*^*{title}" for i, title in enumerate(titles, 1)]
+
+    wiki_titles = []
+    for title in titles:
+        kind = rng.random()
+        if kind < 0.6:
+            wiki_titles.append(title)
+        elif kind < 0.85:
+            wiki_titles.append(add_typos(rng, title, rng.randint(1, 2)))
+        else:
+            wiki_titles.append(random_title(rng))
+    rng.shuffle(wiki_titles)
+    return wiki_titles, system_records
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _sample(items: List, count: int, seed: int) -> List:
+    if count >= len(items):
+        return list(items)
+    return random.Random(seed).sample(items, count)
+
+
+def _reference_first_rule(parsed_rules, query_key: str) -> Optional[str]:
+    # The original compare.py loop: every system rule, in list order
+    from Levenshtein import distance
+
+    from matcher import is_close_match
+    for rule in parsed_rules:
+        if is_close_match(distance(rule.key, query_key), len(rule.name)):
+            return rule.rule_id
+    return None
+
+
+def _reference_best_rule(parsed_rules, query_key: str) -> Optional[str]:
+    from Levenshtein import distance
+
+    from matcher import is_close_match
+    best = None
+    for rule in parsed_rules:
+        d = distance(rule.key, query_key)
+        if is_close_match(d, len(rule.name)) and (best is None or d < best[0]):
+            best = (d, rule.rule_id)
+    return best[1] if best else None
+
+
+def _run_normalizer(name: str, wiki_titles: List[str], system_records: List[str]):
+    import normalize
+
+    normalizer = {
+        'normalize.clean_keys': normalize.clean_keys,
+        'normalize.strip_system_suffixes': normalize.strip_system_suffixes_many,
+        'normalize.normalize_text': lambda texts: normalize.normalize_many(texts, normalize.normalize_text),
+        'normalize.clean_comma_suffixed_key':
+            lambda texts: normalize.normalize_many(texts, normalize.clean_comma_suffixed_key),
+    }[name]
+    start = time.perf_counter()
+    normalizer(system_records)
+    return {'seconds': time.perf_counter() - start, 'items': len(system_records)}
+
+
+def _run_existing(best_match: bool, blocking: bool, wiki_titles: List[str], system_records: List[str],
+                  queries: int, parity_sample: int, seed: int):
+    from compare import (build_blocked_system_matcher, build_system_matcher, clean_law_texts, clean_system_rules,
+                         find_best_rule, find_existing_rule)
+    from normalize import clean_key
+    from system_rules import parse_system_rules
+
+    start = time.perf_counter()
+    cleaned_system_rules, _ = clean_system_rules(system_records)
+    parsed_rules = parse_system_rules(cleaned_system_rules, name_field=1)
+    state = (build_blocked_system_matcher if blocking else build_system_matcher)(parsed_rules)
+    build_seconds = time.perf_counter() - start
+
+    find_rule = find_best_rule if best_match else find_existing_rule
+    query_texts = _sample(clean_law_texts(wiki_titles), queries, seed)
+    start = time.perf_counter()
+    found = [find_rule(state, text) for text in query_texts]
+    seconds = time.perf_counter() - start
+
+    reference = _reference_best_rule if best_match else _reference_first_rule
+    checked = query_texts[:parity_sample]
+    mismatches = sum(1 for text, rule_id in zip(checked, found)
+                     if reference(parsed_rules, clean_key(text)) != rule_id)
+    return {'seconds': seconds, 'build_seconds': build_seconds, 'items': len(query_texts),
+            'matched': sum(rule_id is not None for rule_id in found),
+            'parity': {'checked': len(checked), 'mismatches': mismatches}}
+
+
+def _run_missing_in_wiki(wiki_titles: List[str], system_records: List[str],
+                         queries: int, parity_sample: int, seed: int):
+    from compare_fast import SimilarityIndex, simple_similarity
+    from normalize import clean_comma_suffixed_key, clean_keys
+    from system_rules import parse_system_rules
+
+    start = time.perf_counter()
+    cleaned_law_texts = clean_keys(wiki_titles)
+    index = SimilarityIndex(cleaned_law_texts)
+    build_seconds = time.perf_counter() - start
+
+    parsed_rules = parse_system_rules(system_records, name_field=None, normalize=clean_comma_suffixed_key)
+    keys = _sample([rule.key for rule in parsed_rules], queries, seed)
+    start = time.perf_counter()
+    found = [index.any_similar(key) for key in keys]
+    seconds = time.perf_counter() - start
+
+    checked = keys[:parity_sample]
+    mismatches = sum(1 for key, similar in zip(checked, found)
+                     if any(simple_similarity(key, text) for text in cleaned_law_texts) != similar)
+    return {'seconds': seconds, 'build_seconds': build_seconds, 'items': len(keys),
+            'matched': sum(found), 'parity': {'checked': len(checked), 'mismatches': mismatches}}
+
+
+def _run_exact(wiki_titles: List[str], system_records: List[str], parity_sample: int):
+    from matcher import split_exact_matches
+    from normalize import normalize_many, normalize_text
+    from system_rules import parse_system_rules
+
+    start = time.perf_counter()
+    normalized_law_texts = set(normalize_many(wiki_titles, normalize_text))
+    parsed_rules = parse_system_rules(system_records, name_field=None, normalize=normalize_text)
+    exact_rules, missing_rules = split_exact_matches(parsed_rules, normalized_law_texts)
+    seconds = time.perf_counter() - start
+
+    # The original compare_fixed.py check: a linear scan of the normalized wiki list
+    normalized_list = [normalize_text(text) for text in wiki_titles] if parity_sample else []
+    checked = parsed_rules[:parity_sample]
+    exact_set = {rule.raw for rule in exact_rules}
+    mismatches = sum(1 for rule in checked
+                     if (normalize_text(rule.raw) in normalized_list) != (rule.raw in exact_set))
+    return {'seconds': seconds, 'items': len(parsed_rules), 'matched': len(exact_rules),
+            'parity': {'checked': len(checked), 'mismatches': mismatches}}
+
+
+def run_case(case: str, size: int, queries: int, parity_sample: int, seed: int,
+             trace_memory: bool = False) -> dict:
+    """Run one case on a freshly generated corpus and return its measurements."""
+    wiki_titles, system_records = generate_corpus(size, seed)
+    baseline_rss = _peak_rss_mb()
+    if trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+
+    if case.startswith('normalize.'):
+        result = _run_normalizer(case, wiki_titles, system_records)
+    elif case in ('existing', 'best-match', 'existing-blocking'):
+        result = _run_existing(case == 'best-match', case == 'existing-blocking', wiki_titles, system_records, queries, parity_sample, seed)
+    elif case == 'missing-in-wiki':
+        result = _run_missing_in_wiki(wiki_titles, system_records, queries, parity_sample, seed)
+    elif case == 'exact':
+        result = _run_exact(wiki_titles, system_records, parity_sample)
+    else:
+        raise ValueError(f"Unknown case: {case}")
+
+    if trace_memory:
+        result['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+    result.update(case=case, size=size, baseline_peak_rss_mb=baseline_rss, peak_rss_mb=_peak_rss_mb(),
+                  items_per_second=result['items'] / result['seconds'] if result['seconds'] else None)
+    result.setdefault('parity', None)
+    return result
+
+
+def main(sizes: List[int], cases: List[str], queries: int = 1000, parity_sample: int = 20,
+         seed: int = 0, trace_memory: bool = False, out_path: str = 'benchmark_results.json'):
+    results = []
+    spawn = multiprocessing.get_context('spawn')
+    for size in sizes:
+        for case in cases:
+            # A fresh process per case, so the peak RSS is not inherited from earlier cases
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as executor:
+                result = executor.submit(run_case, case, size, queries, parity_sample, seed, trace_memory).result()
+            results.append(result)
+
+            parity = result['parity']
+            parity_text = 'n/a' if parity is None else f"{parity['checked'] - parity['mismatches']}/{parity['checked']}"
+            rss_text = 'n/a' if result['peak_rss_mb'] is None else f"{result['peak_rss_mb']:.0f} MB"
+            print(f"{case:36s} {size:>9,d}  {result['seconds']:8.3f}s  "
+                  f"{result['items_per_second']:>12,.0f}/s  peak RSS {rss_text:>8s}  parity {parity_text}")
+            if parity is not None and parity['mismatches']:
+                print(f"  ⚠ {parity['mismatches']} parity mismatches")
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'queries': queries,
+        'parity_sample': parity_sample,
+        'results': results,
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✓ Saved {len(results)} results to '{out_path}'")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the comparison strategies on synthetic law titles.")
+    parser.add_argument('--sizes', default='10000,100000',
+                        help="Comma-separated corpus sizes (e.g. 10000,100000,1000000)")
+    parser.add_argument('--cases', default=','.join(CASES), help="Comma-separated cases to run")
+    parser.add_argument('--queries', type=int, default=1000, help="Timed lookups per matching case")
+    parser.add_argument('--parity-sample', type=int, default=20,
+                        help="Lookups checked against the brute-force reference (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument('--tracemalloc', action='store_true', help="Also record the peak of traced Python allocations")
+    parser.add_argument('--out', default='benchmark_results.json', help="Output JSON file")
+    args = parser.parse_args()
+    main([int(size) for size in args.sizes.split(',')], args.cases.split(','), queries=args.queries,
+         parity_sample=args.parity_sample, seed=args.seed, trace_memory=args.tracemalloc, out_path=args.out)
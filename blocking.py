@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Blocking keys for Hebrew law titles: only compare titles that share a block.
+
+Most near misses between the wiki and the system differ in quote marks,
+geresh, maqaf, or the ktiv male letters ו and י. Every key is reduced to
+a few compact blocking keys:
+
+- skeleton: the letters and digits without ו and י, with final letters
+  written as regular ones, so those spelling differences disappear;
+- head / tail: the first and last BLOCK_EDGE characters of the skeleton,
+  so a typo in one end still leaves the other end's block shared;
+- rare letters: the RARE_LETTERS least frequent letters of the key (by
+  frequency in the indexed keys), sorted.
+
+BlockedMatcher verifies only the keys sharing at least one block with the
+query, with the same distance and ordering as FuzzyMatcher, so it can be
+used in its place. Unlike FuzzyMatcher it can miss matches; recall_report()
+measures that loss against exhaustive matching. Run this module to print it
+for the live lists or for a synthetic corpus.
+"""
+
+import argparse
+import json
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from instrumentation import metrics
+from matcher import FuzzyMatcher
+
+BLOCK_EDGE = 10
+RARE_LETTERS = 6
+
+_SKELETON_TABLE = str.maketrans({'ו': None, 'י': None, 'ך': 'כ', 'ם': 'מ', 'ן': 'נ', 'ף': 'פ', 'ץ': 'צ'})
+
+
+def skeleton_key(key: str) -> str:
+    """Return the key without ו/י and with final letters as regular ones.
+
+    Expects a key already reduced to letters and digits (normalize.clean_key),
+    so quote marks, geresh and maqaf are gone before this point.
+    """
+    return key.translate(_SKELETON_TABLE)
+
+
+def letter_frequencies(keys: Sequence[str]) -> Counter:
+    """Count every letter (not digit) over all keys."""
+    frequencies = Counter()
+    for key in keys:
+        frequencies.update(key)
+    for digit in '0123456789':
+        frequencies.pop(digit, None)
+    return frequencies
+
+
+def rare_letter_signature(skeleton: str, frequencies: Counter, size: int = RARE_LETTERS) -> str:
+    """Return the `size` least frequent distinct letters of the skeleton, sorted."""
+    letters = sorted((frequencies.get(char, 0), char) for char in set(skeleton) if not char.isdigit())
+    return ''.join(sorted(char for _, char in letters[:size]))
+
+
+class BlockedMatcher(FuzzyMatcher):
+    """FuzzyMatcher whose candidates are the keys sharing a blocking key with the query."""
+
+    def __init__(self, keys: List[str], max_distance: int = 2):
+        # Only the attributes used by search() and top_k(); the segment index is not built
+        self.keys = list(keys)
+        self.max_distance = max_distance
+        skeletons = [skeleton_key(key) for key in self.keys]
+        self.frequencies = letter_frequencies(skeletons)
+        # (kind, value) -> indexes of keys, in key order
+        self.blocks: Dict[tuple, List[int]] = {}
+        for index, skeleton in enumerate(skeletons):
+            for block in self.block_keys(skeleton):
+                self.blocks.setdefault(block, []).append(index)
+
+    def block_keys(self, skeleton: str) -> Set[tuple]:
+        """Return the blocking keys of a skeleton."""
+        return {
+            ('skeleton', skeleton),
+            ('head', skeleton[:BLOCK_EDGE]),
+            ('tail', skeleton[-BLOCK_EDGE:]),
+            ('rare', rare_letter_signature(skeleton, self.frequencies)),
+        }
+
+    def candidates(self, query: str, max_distance: int = None) -> List[int]:
+        """Return indexes of keys that share a block with query."""
+        found = set()
+        for block in self.block_keys(skeleton_key(query)):
+            found.update(self.blocks.get(block, ()))
+        metrics.count('match.queries')
+        metrics.count('match.pairs_pruned', len(self.keys) - len(found))
+        return sorted(found)
+
+    def block_sizes(self) -> Dict[str, int]:
+        """Return the largest block of each kind."""
+        largest = {}
+        for (kind, _), indexes in self.blocks.items():
+            largest[kind] = max(largest.get(kind, 0), len(indexes))
+        return largest
+
+
+def recall_report(keys: List[str], queries: List[str], max_distance: int = 2,
+                  accept: Optional[Callable[[int, int], bool]] = None) -> dict:
+    """Compare blocked with exhaustive matching of queries against keys.
+
+    accept(index, distance) is the acceptance rule of the caller (e.g.
+    is_close_match on the system name length); the first accepted match of
+    each query is compared as in compare.py.
+    """
+    exhaustive = FuzzyMatcher(keys, max_distance)
+    blocked = BlockedMatcher(keys, max_distance)
+
+    exact_pairs = found_pairs = blocked_candidates = exhaustive_candidates = 0
+    first_matches = first_agreements = 0
+    for query in queries:
+        exact = exhaustive.search(query)
+        found = blocked.search(query)
+        if accept is not None:
+            exact = [(index, distance) for index, distance in exact if accept(index, distance)]
+            found = [(index, distance) for index, distance in found if accept(index, distance)]
+        exact_pairs += len(exact)
+        found_pairs += len(found)
+        exhaustive_candidates += len(exhaustive.candidates(query))
+        blocked_candidates += len(blocked.candidates(query))
+        if exact:
+            first_matches += 1
+            first_agreements += bool(found) and found[0][0] == exact[0][0]
+
+    return {
+        'queries': len(queries),
+        'keys': len(keys),
+        'all_pairs': len(queries) * len(keys),
+        'segment_index_candidates': exhaustive_candidates,
+        'blocked_candidates': blocked_candidates,
+        'close_pairs': exact_pairs,
+        'close_pairs_found': found_pairs,
+        'pair_recall': found_pairs / exact_pairs if exact_pairs else 1.0,
+        'queries_with_match': first_matches,
+        'same_first_match': first_agreements,
+        'first_match_recall': first_agreements / first_matches if first_matches else 1.0,
+        'largest_blocks': blocked.block_sizes(),
+    }
+
+
+def print_recall_report(report: dict):
+    print("\n=== Blocking recall ===")
+    print(f"  Queries x keys: {report['queries']:,} x {report['keys']:,} = {report['all_pairs']:,} pairs")
+    print(f"  Candidates verified: {report['blocked_candidates']:,} blocked, "
+          f"{report['segment_index_candidates']:,} with the segment index")
+    print(f"  Close pairs found: {report['close_pairs_found']:,} of {report['close_pairs']:,} "
+          f"({report['pair_recall']:.2%})")
+    print(f"  Same first match: {report['same_first_match']:,} of {report['queries_with_match']:,} "
+          f"({report['first_match_recall']:.2%})")
+    print(f"  Largest blocks: {report['largest_blocks']}")
+
+
+def main(synthetic_size: Optional[int] = None, seed: int = 0, cache=None, out_path: Optional[str] = None):
+    from compare import clean_law_texts, clean_system_rules, fetch_system_rules
+    from matcher import is_close_match
+    from normalize import clean_keys
+    from system_rules import parse_system_rules
+
+    if synthetic_size:
+        from benchmark import generate_corpus
+        law_texts, system_records = generate_corpus(synthetic_size, seed)
+    else:
+        from extract_rules import extract_all_rules
+        law_texts = extract_all_rules(cache)
+        system_records = fetch_system_rules(cache)
+
+    cleaned_system_rules, _ = clean_system_rules(system_records)
+    parsed_rules = parse_system_rules(cleaned_system_rules, name_field=1)
+    queries = clean_keys(clean_law_texts(law_texts))
+    report = recall_report([rule.key for rule in parsed_rules], queries,
+                           accept=lambda index, distance: is_close_match(distance, len(parsed_rules[index].name)))
+    print_recall_report(report)
+
+    if out_path:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"✓ Saved the recall report to '{out_path}'")
+    return report
+
+
+if __name__ == "__main__":
+    from http_cache import add_cache_arguments, cache_from_args
+
+    parser = argparse.ArgumentParser(description="Measure the recall of blocked matching against exhaustive matching.")
+    parser.add_argument('--synthetic', type=int, default=None,
+                        help="Use a synthetic corpus of this size (see benchmark.py) instead of the live lists")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic corpus")
+    parser.add_argument('--out', default=None, help="Also save the report to this JSON file")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    main(synthetic_size=args.synthetic, seed=args.seed, cache=cache_from_args(args), out_path=args.out)
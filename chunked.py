@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Memory-bounded chunked mode for the scripts that go over the system records.
+
+In this mode the system records are streamed from the endpoint, the cache
+file or a snapshot in batches. Every batch is parsed, matched against the
+wiki index and its report rows written before the next batch is read, so
+memory use follows the batch size instead of the size of the dump. The wiki
+side (a few thousand titles) is still held whole.
+
+The scripts that report wiki titles (compare.py, compareVikiNotInSystem.py)
+cannot write a row per batch, since a later batch may hold a title's match.
+match_wiki_keys() turns their lookup around: the wiki keys are indexed once
+and every system rule, in list order, is looked up in that index. A title
+keeps the first accepted rule (or the closest one, the first on ties), which
+is the rule a forward pass over the whole list finds, so only one match per
+title is held until the report is written.
+
+--memory-budget sets the batch size from RECORD_BYTES, an upper estimate of
+the memory one record in flight takes (the raw record, its parsed rule and
+normalized key, and the list slots of the batch); --batch-size sets it
+directly.
+"""
+
+from typing import Iterable, Iterator, List, Optional
+
+from instrumentation import stage
+from matcher import FuzzyMatcher, is_close_match
+from parallel import WorkerPool
+
+# tracemalloc shows about 400 bytes per record for the similarity pass and 700 for
+# the suffix report on lawdata-like records; the rest is headroom
+RECORD_BYTES = 1024
+DEFAULT_MEMORY_BUDGET_MB = 64
+
+
+def batch_size_for_budget(memory_budget_mb: float) -> int:
+    """Return the number of records a batch may hold within memory_budget_mb."""
+    return max(1, int(memory_budget_mb * 1024 * 1024 // RECORD_BYTES))
+
+
+def add_chunked_arguments(parser):
+    """Add the --batch-size / --memory-budget options to an argparse parser."""
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Stream the system records in batches of this many records")
+    parser.add_argument('--memory-budget', type=float, default=None,
+                        help=f"Stream the system records in batches fitting in this many MB "
+                             f"(e.g. {DEFAULT_MEMORY_BUDGET_MB}); the wiki index comes on top")
+
+
+def batch_size_from_args(args) -> Optional[int]:
+    """Return the batch size requested on the command line, or None for a whole-list run."""
+    if args.batch_size:
+        return args.batch_size
+    if args.memory_budget:
+        return batch_size_for_budget(args.memory_budget)
+    return None
+
+
+def iter_system_batches(url: str, batch_size: int, cache=None, snapshot: Optional[str] = None) -> Iterator[List[str]]:
+    """Yield the raw system records of url (or of a system snapshot of url) in lists of up to batch_size."""
+    if snapshot:
+        from snapshot import iter_text_batches
+        return iter_text_batches(snapshot, 'system', batch_size, url)
+
+    from system_rules import SystemRulesClient
+    print(f"Streaming system rules in batches of {batch_size}")
+    return SystemRulesClient(url, cache=cache).iter_batches(batch_size)
+
+
+def build_wiki_matcher(wiki_keys: List[str], blocking: bool = False) -> FuzzyMatcher:
+    """Index the wiki keys for reverse lookups within edit distance 2."""
+    if blocking:
+        from blocking import BlockedMatcher
+        return BlockedMatcher(wiki_keys, max_distance=2)
+    return FuzzyMatcher(wiki_keys, max_distance=2)
+
+
+def find_close_wiki_keys(wiki_matcher: FuzzyMatcher, system_key: str):
+    """Return (wiki index, distance) of every wiki key within edit distance 2 of system_key."""
+    return wiki_matcher.search(system_key)
+
+
+def match_wiki_keys(wiki_keys: List[str], rule_batches: Iterable[list], workers: int = 1,
+                    best_match: bool = False, blocking: bool = False) -> list:
+    """Return the matched system rule (or None) of every wiki key, reading the rules batch by batch.
+
+    With blocking, the blocks are built over the wiki keys instead of the
+    system keys, so the few matches blocking misses can differ from a
+    whole-list --blocking run.
+    """
+    matches = [None] * len(wiki_keys)
+    distances = [None] * len(wiki_keys)
+    with WorkerPool(build_wiki_matcher, (wiki_keys, blocking), workers) as pool:
+        for parsed_rules in rule_batches:
+            with stage('match'):
+                close_keys = pool.map(find_close_wiki_keys, [rule.key for rule in parsed_rules])
+                for rule, pairs in zip(parsed_rules, close_keys):
+                    for index, distance in pairs:
+                        if not is_close_match(distance, len(rule.name)):
+                            continue
+                        # A later rule only replaces a strictly closer match, so ties keep list order
+                        if matches[index] is None or (best_match and distance < distances[index]):
+                            matches[index] = rule
+                            distances[index] = distance
+    return matches
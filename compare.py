@@ -1,68 +1,33 @@
-from extract_rules import WikiRulesExtractor
-import re
+from chunked import add_chunked_arguments, batch_size_from_args, iter_system_batches, match_wiki_keys
+from contextlib import ExitStack
+from extract_rules import fetch_inputs, load_law_texts
+from http_cache import add_cache_arguments, cache_from_args
+from incremental import StateStore, incremental_match
+from instrumentation import add_metrics_arguments, instrumented, stage
+import argparse
 import os
-import requests
-import pandas as pd
-import Levenshtein
-
-def extract_all_rules():
-    """Example of basic usage - extracting and iterating over anchor texts."""
-    print("=== Basic Usage Example ===")
-    
-    # Initialize the extractor
-    url = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
-    extractor = WikiRulesExtractor(url)
-    
-    # Extract law-related anchor texts
-    print("Extracting law-related anchor texts...")
-    law_texts = extractor.extract_all_rules(filter_laws=True)
-    
-    print(f"\nExtracted {len(law_texts)} law-related texts")
-    print("\nFirst 5 examples:")
-    for i, text in enumerate(law_texts[:5], 1):
-        print(f"  {i}. {text}")
-    
-    return law_texts
-
-def main():
-
-    law_texts = extract_all_rules()
-    
-    # Clean each item in law_texts to remove non-alphanumeric characters
-    cleaned_law_texts = []
-    for text in law_texts:
-        text=re.sub(r'\(\s*החדשות\s*\)', '', text)
-        cleaned_law_texts.append(text.strip())
-
+from matcher import FuzzyMatcher, is_close_match
+from normalize import clean_key, clean_keys, clean_wiki_titles, strip_system_suffixes_many
+from parallel import parallel_map
+from report_writer import FORMATS, ReportWriter, report_path, write_report
+from snapshot import add_snapshot_arguments
+from system_rules import fetch_records, parse_system_rules
 
+SYSTEM_RULES_URL = 'https://www.lawdata.co.il/lawdata_face_lift_test/getallhoknamesforcompare.asp'
 
+def clean_law_texts(law_texts):
+    """Drop the "(החדשות)" marker from the wiki texts."""
+    return clean_wiki_titles(law_texts)
 
+def clean_system_rules(system_rules):
+    """Strip the version block and year suffix from the system rules.
 
-    # Fetch the content from the URL
-    response = requests.get('https://www.lawdata.co.il/lawdata_face_lift_test/getallhoknamesforcompare.asp')
-    response.encoding = 'utf-8'  # Ensure proper Hebrew encoding
-    
-    # Split the content by *&* and store in array
-    system_rules = response.text.split('*&*')
-    
-    # Clean each item in system_rules to remove non-alphanumeric characters
+    Returns the cleaned rules and the rules whose two suffix variants differ.
+    """
     cleaned_system_rules = []
     rules_variations=[]
 
-    for text in system_rules:
-        textOrg = text
-        text2=text
-
-        text=re.sub(r'[\[(]נוסח [^\])]*[\])]', '', text)
-        text = re.sub( r'[^\(\)[\]\{\}a-zA-Zא-ת0-9]*[א-ת"׳]+\s*([-–]\s*)?\d{2,6}[^\(\)[\]\{\}a-zA-Zא-ת0-9]*$', '', text)
-
-        # text2 = re.sub( r'[^a-zA-Zא-ת0-9]*\s*([-–]\s*)?\d{2,6}[^a-zA-Zא-ת0-9]*$', '', text2)
-        #  text2=re.sub(r'[\[(]נוסח [^\])]*[\])]', '', text2)
-
-        text2=re.sub(r'[\[(]נוסח [^\])]*[\])]', '', text2)
-        text2 = re.sub(r'[^\(\)[\]\{\}a-zA-Zא-ת0-9]*[ה]?תש([\'"״”]+|.[\'"״”]+)[^\(\)]+\d+[^\(\)[\]\{\}a-zA-Zא-ת0-9]*$', '', text2)
-        text2 = re.sub(r',\s*\d{4}$', '', text2)
-
+    for textOrg, (text, text2) in zip(system_rules, strip_system_suffixes_many(system_rules)):
         cleaned_system_rules.append(text2.strip())
         if text != text2 :
             rules_variations.append({
@@ -71,43 +36,181 @@ def main():
                 'text2': text2
             })
 
+    return cleaned_system_rules, rules_variations
+
+def fetch_system_rules(cache=None, snapshot=None):
+    """Return the raw system rule records, from the endpoint or from a snapshot."""
+    return fetch_records(SYSTEM_RULES_URL, cache, snapshot)
+
+def suffix_report_path(report_format=None):
+    """Return the path of the special suffix report, next to this script."""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    return report_path(os.path.join(script_dir, "systemRulesWithSpecialSuffix.xlsx"), report_format)
+
+def write_suffix_report(rules_variations, report_format=None):
+    """Save the rules whose two suffix variants differ next to this script."""
+    out_path = suffix_report_path(report_format)
+    # Save rules_variations (with columns textOrg, text, text2) to Excel
+    write_report(out_path, ['textOrg', 'text', 'text2'],
+                 ((row['textOrg'], row['text'], row['text2']) for row in rules_variations))
+    return out_path
+
+def suffix_report(cache=None, report_format=None, system_snapshot=None, batch_size=None):
+    """Only write the special suffix report of the system rules."""
+    if batch_size:
+        # Clean and write one batch at a time instead of collecting every variation first
+        out_path = suffix_report_path(report_format)
+        written = 0
+        with ReportWriter(out_path) as writer:
+            sheet = writer.add_sheet('Sheet1', ['textOrg', 'text', 'text2'])
+            for batch in iter_system_batches(SYSTEM_RULES_URL, batch_size, cache, system_snapshot):
+                with stage('normalize'):
+                    _, rules_variations = clean_system_rules(batch)
+                for row in rules_variations:
+                    sheet.write_row((row['textOrg'], row['text'], row['text2']))
+                written += len(rules_variations)
+        print(f"✓ Saved {written} rules with a special suffix to '{out_path}'")
+        return
+
+    _, rules_variations = clean_system_rules(fetch_system_rules(cache, system_snapshot))
+    out_path = write_suffix_report(rules_variations, report_format)
+    print(f"✓ Saved {len(rules_variations)} rules with a special suffix to '{out_path}'")
+
+def build_system_matcher(parsed_rules):
+    """Index the system rule keys for lookups within edit distance 2."""
+    return FuzzyMatcher([rule.key for rule in parsed_rules], max_distance=2), parsed_rules
+
+def build_blocked_system_matcher(parsed_rules):
+    """Like build_system_matcher, but only compare rules sharing a blocking key (may miss a few matches)."""
+    from blocking import BlockedMatcher
+    return BlockedMatcher([rule.key for rule in parsed_rules], max_distance=2), parsed_rules
+
+def find_existing_rule(state, viki_rule):
+    """Return the id of the first system rule matching viki_rule, or None."""
+    matcher, parsed_rules = state
+    for j, distance in matcher.search(clean_key(viki_rule)):
+        rule = parsed_rules[j]
+        if is_close_match(distance, len(rule.name)):
+            return rule.rule_id
+    return None
+
+def find_best_rule(state, viki_rule):
+    """Return the id of the closest system rule matching viki_rule (first in list order on ties), or None."""
+    matcher, parsed_rules = state
+    best = matcher.top_k(clean_key(viki_rule), k=1,
+                         accept=lambda j, distance: is_close_match(distance, len(parsed_rules[j].name)))
+    return parsed_rules[best[0][0]].rule_id if best else None
+
+def write_existing_rules(existing_rules, report_format=None):
+    """Save the (system rule id, wiki rule) pairs."""
+    write_report(report_path('existing_rules_181225.xlsx', report_format), ['Rule Index', 'Rule Name'], existing_rules)
+
+    print (f"✓ finished")
+
+def main_chunked(batch_size, workers=1, cache=None, best_match=False, report_format=None, blocking=False,
+                 wiki_snapshot=None, system_snapshot=None):
+    """main() over batches of system rules, looked up in an index of the wiki rules.
+
+    The special suffix rows are written as each batch is cleaned.
+    """
+    law_texts = load_law_texts(cache, wiki_snapshot)
+    with stage('normalize'):
+        cleaned_law_texts = clean_law_texts(law_texts)
+        wiki_keys = clean_keys(cleaned_law_texts)
+
+    with ExitStack() as stack:
+        suffix_sheet = None
+
+        def parsed_batches():
+            nonlocal suffix_sheet
+            for batch in iter_system_batches(SYSTEM_RULES_URL, batch_size, cache, system_snapshot):
+                with stage('normalize'):
+                    cleaned_system_rules, rules_variations = clean_system_rules(batch)
+                    parsed_rules = parse_system_rules(cleaned_system_rules, name_field=1)
+                if rules_variations and suffix_sheet is None:
+                    # Like main(), only write the suffix report if there is a variation
+                    writer = stack.enter_context(ReportWriter(suffix_report_path(report_format)))
+                    suffix_sheet = writer.add_sheet('Sheet1', ['textOrg', 'text', 'text2'])
+                for row in rules_variations:
+                    suffix_sheet.write_row((row['textOrg'], row['text'], row['text2']))
+                yield parsed_rules
+
+        matched_rules = match_wiki_keys(wiki_keys, parsed_batches(), workers=workers,
+                                        best_match=best_match, blocking=blocking)
+
+    write_existing_rules([(rule.rule_id, viki_rule)
+                          for viki_rule, rule in zip(cleaned_law_texts, matched_rules) if rule is not None],
+                         report_format)
+
+def main(workers=1, cache=None, state_db=None, best_match=False, report_format=None, blocking=False,
+         wiki_snapshot=None, system_snapshot=None, batch_size=None):
+    if state_db and best_match:
+        raise ValueError("--state-db stores first-match results, it cannot be used with --best-match")
+    if state_db and blocking:
+        raise ValueError("--state-db matches against every system rule, it cannot be used with --blocking")
+    if state_db and workers > 1:
+        raise ValueError("--state-db re-matches in this process, it cannot be used with --workers")
+    if batch_size:
+        if state_db:
+            raise ValueError("--state-db needs the whole system list, it cannot be used with --batch-size")
+        return main_chunked(batch_size, workers=workers, cache=cache, best_match=best_match,
+                            report_format=report_format, blocking=blocking,
+                            wiki_snapshot=wiki_snapshot, system_snapshot=system_snapshot)
+
+    law_texts, system_rules = fetch_inputs(SYSTEM_RULES_URL, cache, wiki_snapshot, system_snapshot)
+
+    with stage('normalize'):
+        cleaned_law_texts = clean_law_texts(law_texts)
+
+    with stage('normalize'):
+        cleaned_system_rules, rules_variations = clean_system_rules(system_rules)
     
     if rules_variations:
         # Save cleaned_system_rules to Excel in same directory as this py file
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        out_path = os.path.join(script_dir, "systemRulesWithSpecialSuffix.xlsx")
-        # Save rules_variations (with columns textOrg, text, text2) to Excel
-        df_rules_variations = pd.DataFrame(rules_variations, columns=['textOrg', 'text', 'text2'])
-        df_rules_variations.to_excel(out_path, index=False)
+        write_suffix_report(rules_variations, report_format)
     
     
-    # Find rules in system_rules that are not in law_texts
-    existing_rules = []
-        
-    for i,viki_rule in enumerate(cleaned_law_texts):
-        if "פיצוי וסיוע בשל ביטול טיסה" in viki_rule: #for debugging
-            m=1
-        for j,system_rule in enumerate(cleaned_system_rules):
-            if "פיצוי וסיוע בשל ביטול טיסה" in system_rule: #for debugging
-                m=2
-
-            if "*^*" in system_rule:
-                distance = Levenshtein.distance(re.sub(r'[^a-zA-Zא-ת0-9]', '', system_rule.split("*^*")[1]), re.sub(r'[^a-zA-Zא-ת0-9]', '', viki_rule))
-                if (distance < 3 and len(system_rule.split("*^*")[1]) > 20) or (distance < 2 and len(system_rule.split("*^*")[1]) > 5 ):  # Only consider strings longer than 5 characters
-                    rule_c_and_name = system_rule.split("*^*")[0]+"*&*"+viki_rule
-                    existing_rules.append(rule_c_and_name)
-                    break
-    
-    # Create DataFrame with existing rules
+    # Split and normalize every system rule once, then index the names so
+    # each wiki rule only visits the system rules within edit distance 2
+    with stage('normalize'):
+        parsed_rules = parse_system_rules(cleaned_system_rules, name_field=1)
 
-    # Split each item in existing_rules by '*&*' and create separate columns
-    split_rules = [rule.split('*&*') for rule in existing_rules]
-    df = pd.DataFrame(split_rules, columns=['Rule Index', 'Rule Name'])
+    # Find rules in system_rules that are not in law_texts
+    with stage('match'):
+        if state_db:
+            # Only re-match the rules that changed since the previous run
+            store = StateStore(state_db)
+            matched_rules = incremental_match(store, cleaned_law_texts, parsed_rules)
+            store.close()
+            matched_ids = [matched_rules[viki_rule].rule_id if matched_rules[viki_rule] else None
+                           for viki_rule in cleaned_law_texts]
+        else:
+            find_rule = find_best_rule if best_match else find_existing_rule
+            build_matcher = build_blocked_system_matcher if blocking else build_system_matcher
+            matched_ids = parallel_map(find_rule, cleaned_law_texts, build_matcher,
+                                       (parsed_rules,), workers=workers)
+    existing_rules = [(rule_id, viki_rule)
+                      for viki_rule, rule_id in zip(cleaned_law_texts, matched_ids) if rule_id is not None]
     
     # Save to Excel file
-    df.to_excel('existing_rules_181225.xlsx', index=False)
-
-    print (f"✓ finished")
+    write_existing_rules(existing_rules, report_format)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find wiki rules that exist in the system.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes for the fuzzy pass")
+    parser.add_argument('--state-db', default=None,
+                        help="SQLite file with the previous run, to only re-match changed rules")
+    parser.add_argument('--best-match', action='store_true',
+                        help="Report the closest system rule instead of the first close one in list order")
+    parser.add_argument('--blocking', action='store_true',
+                        help="Only compare rules sharing a blocking key (faster, may miss matches; see blocking.py)")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_chunked_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        main(workers=args.workers, cache=cache_from_args(args), state_db=args.state_db, best_match=args.best_match,
+             report_format=args.format, blocking=args.blocking, wiki_snapshot=args.wiki_snapshot,
+             system_snapshot=args.system_snapshot, batch_size=batch_size_from_args(args)) 
\ No newline at end of file
@@ -1,84 +1,113 @@
-from extract_rules import WikiRulesExtractor
-import re
+from chunked import add_chunked_arguments, batch_size_from_args, iter_system_batches, match_wiki_keys
+from extract_rules import fetch_inputs, load_law_texts
+from http_cache import add_cache_arguments, cache_from_args
+from incremental import StateStore, incremental_match
+from instrumentation import add_metrics_arguments, instrumented, stage
+import argparse
 import os
-import requests
-import pandas as pd
-import Levenshtein
+from matcher import FuzzyMatcher, is_close_match
+from normalize import clean_key, clean_keys, clean_wiki_titles
+from parallel import parallel_map
+from report_writer import FORMATS, report_path, write_report
+from snapshot import add_snapshot_arguments
+from system_rules import parse_system_rules
 
-def extract_all_rules():
-    """Example of basic usage - extracting and iterating over anchor texts."""
-    print("=== Basic Usage Example ===")
-    
-    # Initialize the extractor
-    url = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
-    extractor = WikiRulesExtractor(url)
-    
-    # Extract law-related anchor texts
-    print("Extracting law-related anchor texts...")
-    law_texts = extractor.extract_all_rules(filter_laws=True)
-    
-    print(f"\nExtracted {len(law_texts)} law-related texts")
-    print("\nFirst 5 examples:")
-    for i, text in enumerate(law_texts[:5], 1):
-        print(f"  {i}. {text}")
-    
-    return law_texts
+SYSTEM_RULES_URL = 'https://www.lawdata.co.il/lawdata_face_lift_test/getallrulesnamesforcompare.asp'
 
-def main():
+def build_system_matcher(parsed_rules):
+    """Index the system rule keys for lookups within edit distance 2."""
+    return FuzzyMatcher([rule.key for rule in parsed_rules], max_distance=2), parsed_rules
 
-    law_texts = extract_all_rules()
-    
-    # Clean each item in law_texts to remove non-alphanumeric characters
-    cleaned_law_texts = []
-    for text in law_texts:
-        text=re.sub(r'\(\s*החדשות\s*\)', '', text)
-        cleaned_law_texts.append(text.strip())
-
-    # Fetch the content from the URL
-    response = requests.get('https://www.lawdata.co.il/lawdata_face_lift_test/getallrulesnamesforcompare.asp')
-    response.encoding = 'utf-8'  # Ensure proper Hebrew encoding
-    
-    # Split the content by *&* and store in array
-    system_rules = response.text.split('*&*')
-    
-    # Clean each item in system_rules to remove non-alphanumeric characters
-    cleaned_system_rules = []
+def is_in_system(state, viki_rule):
+    """Return True if some system rule is close enough to viki_rule."""
+    matcher, parsed_rules = state
+    for j, distance in matcher.search(clean_key(viki_rule)):
+        rule = parsed_rules[j]
+        if is_close_match(distance, len(rule.name)):
+            return True
+    return False
 
-    for text in system_rules:
+def clean_system_record(text):
+    """Clean a raw system record before it is split into fields."""
 
 #        text=re.sub(r'[\[(]נוסח [^\])]*[\])]', '', text)
  #       text = re.sub(r'[^\(\)[\]\{\}a-zA-Zא-ת0-9]*[ה]?תש([\'"״”]+|.[\'"״”]+)[^\(\)]+\d+[^\(\)[\]\{\}a-zA-Zא-ת0-9]*$', '', text)
 
-        cleaned_system_rules.append(text.strip())
+    return text.strip()
 
-    # Find rules in viki that are NOT in system_rules
-    missing_rules = []
-        
-    for i, viki_rule in enumerate(cleaned_law_texts):
-        found = False
-        
-        for j, system_rule in enumerate(cleaned_system_rules):
-            if "*^*" in system_rule:
-                distance = Levenshtein.distance(re.sub(r'[^a-zA-Zא-ת0-9]', '', system_rule.split("*^*")[2]), re.sub(r'[^a-zA-Zא-ת0-9]', '', viki_rule))
-                if (distance < 3 and len(system_rule.split("*^*")[2]) > 20) or (distance < 2 and len(system_rule.split("*^*")[2]) > 5):  # Only consider strings longer than 5 characters
-                    found = True
-                    break
-        
-        # If not found in system rules, add to missing_rules
-        if not found:
-            missing_rules.append(viki_rule)
-    
-    # Create DataFrame with missing rules
-    df = pd.DataFrame(missing_rules, columns=['Rule Name'])
-    
-    # Save to Excel file in same directory as this py file
+def write_missing_rules(missing_rules, report_format=None):
+    """Save the wiki rules missing from the system next to this script."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
-    out_path = os.path.join(script_dir, "vikiRulesNotInSystem.xlsx")
-    df.to_excel(out_path, index=False)
+    out_path = report_path(os.path.join(script_dir, "vikiRulesNotInSystem.xlsx"), report_format)
+    write_report(out_path, ['Rule Name'], ((rule,) for rule in missing_rules))
 
     print(f"✓ Finished. Found {len(missing_rules)} rules in viki that are not in system rules.")
     print(f"✓ Saved to {out_path}")
 
+def main_chunked(batch_size, workers=1, cache=None, report_format=None, wiki_snapshot=None, system_snapshot=None):
+    """main() over batches of system rules, looked up in an index of the wiki rules."""
+    law_texts = load_law_texts(cache, wiki_snapshot)
+    with stage('normalize'):
+        cleaned_law_texts = clean_wiki_titles(law_texts)
+        wiki_keys = clean_keys(cleaned_law_texts)
+
+    def parsed_batches():
+        for batch in iter_system_batches(SYSTEM_RULES_URL, batch_size, cache, system_snapshot):
+            with stage('normalize'):
+                parsed_rules = parse_system_rules(map(clean_system_record, batch), name_field=2)
+            yield parsed_rules
+
+    matched_rules = match_wiki_keys(wiki_keys, parsed_batches(), workers=workers)
+    write_missing_rules([viki_rule for viki_rule, rule in zip(cleaned_law_texts, matched_rules) if rule is None],
+                        report_format)
+
+def main(workers=1, cache=None, state_db=None, report_format=None, wiki_snapshot=None, system_snapshot=None,
+         batch_size=None):
+    if state_db and workers > 1:
+        raise ValueError("--state-db re-matches in this process, it cannot be used with --workers")
+    if batch_size:
+        if state_db:
+            raise ValueError("--state-db needs the whole system list, it cannot be used with --batch-size")
+        return main_chunked(batch_size, workers=workers, cache=cache, report_format=report_format,
+                            wiki_snapshot=wiki_snapshot, system_snapshot=system_snapshot)
+
+    # Each record is cleaned and parsed as it streams in, so the raw list is never held
+    law_texts, parsed_rules = fetch_inputs(SYSTEM_RULES_URL, cache, wiki_snapshot, system_snapshot,
+                                           name_field=2, preprocess=clean_system_record)
+
+    # Drop the "(החדשות)" marker from the wiki texts
+    with stage('normalize'):
+        cleaned_law_texts = clean_wiki_titles(law_texts)
+    
+    # Find rules in viki that are NOT in system_rules
+    with stage('match'):
+        if state_db:
+            # Only re-match the rules that changed since the previous run
+            store = StateStore(state_db)
+            matched_rules = incremental_match(store, cleaned_law_texts, parsed_rules)
+            store.close()
+            found = [matched_rules[viki_rule] is not None for viki_rule in cleaned_law_texts]
+        else:
+            found = parallel_map(is_in_system, cleaned_law_texts, build_system_matcher,
+                                 (parsed_rules,), workers=workers)
+    missing_rules = [viki_rule for viki_rule, in_system in zip(cleaned_law_texts, found) if not in_system]
+    
+    # Save to Excel file in same directory as this py file
+    write_missing_rules(missing_rules, report_format)
+
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Find wiki rules that are missing from the system.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes for the fuzzy pass")
+    parser.add_argument('--state-db', default=None,
+                        help="SQLite file with the previous run, to only re-match changed rules")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_chunked_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        main(workers=args.workers, cache=cache_from_args(args), state_db=args.state_db, report_format=args.format,
+             wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot,
+             batch_size=batch_size_from_args(args))
 
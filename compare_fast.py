@@ -1,7 +1,17 @@
-from extract_rules import WikiRulesExtractor
-import re
-import requests
-import pandas as pd
+from chunked import add_chunked_arguments, batch_size_from_args, iter_system_batches
+from extract_rules import fetch_inputs, load_law_texts
+from http_cache import add_cache_arguments, cache_from_args
+from instrumentation import add_metrics_arguments, count, instrumented, stage
+import argparse
+from bisect import bisect_left
+from matcher import TierReport, split_exact_matches
+from parallel import WorkerPool, parallel_map
+from report_writer import FORMATS, ReportWriter, report_path, write_report
+from normalize import clean_comma_suffixed_key, clean_keys
+from snapshot import add_snapshot_arguments
+from system_rules import parse_system_rules
+
+SYSTEM_RULES_URL = 'https://www.lawdata.co.il/lawdata_face_lift_test/getallhoknamesforcompare.asp'
 
 def simple_similarity(str1, str2, threshold=0.8):
     """Simple similarity check based on common characters."""
@@ -27,88 +37,190 @@ def simple_similarity(str1, str2, threshold=0.8):
     similarity = matches / len(shorter)
     return similarity >= threshold
 
-def extract_all_rules():
-    """Extract law-related anchor texts from WikiSource."""
-    print("=== Extracting Wiki Rules ===")
-    
-    url = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
-    extractor = WikiRulesExtractor(url)
-    
-    print("Extracting law-related anchor texts...")
-    law_texts = extractor.extract_all_rules(filter_laws=True)
-    
-    print(f"\nExtracted {len(law_texts)} law-related texts")
-    print("\nFirst 5 examples:")
-    for i, text in enumerate(law_texts[:5], 1):
-        print(f"  {i}. {text}")
-    
-    return law_texts
+def required_matches(length, threshold=0.8):
+    """Smallest in-order match count m with m / length >= threshold, or None if there is none."""
+    for m in range(length + 1):
+        if m / length >= threshold:
+            return m
+    return None
+
+def is_subsequence(chars, text):
+    """Return True if chars appear in text in order, using str.find for every step."""
+    j = 0
+    find = text.find
+    for char in chars:
+        j = find(char, j)
+        if j < 0:
+            return False
+        j += 1
+    return True
+
+class SimilarityIndex:
+    """Batched simple_similarity of one rule against a whole list of texts.
+
+    simple_similarity counts the longest prefix of the shorter string that is
+    a subsequence of the longer one, so a pair passes exactly when the first
+    required_matches() characters of the shorter string appear in order in
+    the longer one. Those prefixes and the character sets are precomputed,
+    a character-set test rejects most pairs before any scan, and the scan
+    itself stops at the first missing character.
+    """
+
+    def __init__(self, texts, threshold=0.8):
+        self.threshold = threshold
+        entries = []
+        for text in texts:
+            # A pair involving a text shorter than 5 characters never passes
+            if len(text) < 5:
+                continue
+            required = required_matches(len(text), threshold)
+            if required is None:
+                continue
+            prefix = text[:required]
+            entries.append((len(text), text, frozenset(text), prefix, frozenset(prefix)))
+        entries.sort(key=lambda entry: entry[0])
+        self.lengths = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def any_similar(self, rule):
+        """Return True if simple_similarity(rule, text, threshold) holds for some indexed text."""
+        if len(rule) < 5:
+            return False
+        required = required_matches(len(rule), self.threshold)
+        if required is None:
+            return False
+        rule_chars = frozenset(rule)
+        rule_prefix = rule[:required]
+        rule_prefix_chars = frozenset(rule_prefix)
+
+        # Counted outside the loops, which are the hot path: a hit stops the scan early,
+        # a miss compares the rule with every indexed text
+        count('similarity.queries')
+        # Texts at least as long as the rule: the rule is the shorter string
+        start = bisect_left(self.lengths, len(rule))
+        for _, text, text_chars, _, _ in self.entries[start:]:
+            if rule_prefix_chars <= text_chars and is_subsequence(rule_prefix, text):
+                count('similarity.early_exits')
+                return True
+
+        # Shorter texts: their own prefix must appear in order in the rule
+        for _, _, _, text_prefix, text_prefix_chars in self.entries[:start]:
+            if text_prefix_chars <= rule_chars and is_subsequence(text_prefix, rule):
+                count('similarity.early_exits')
+                return True
+        count('similarity.full_scan_pairs', len(self.entries))
+        return False
+
+def is_similar_to_any(index, cleaned_rule):
+    """Return True if cleaned_rule is similar to any of the indexed law texts."""
+    return index.any_similar(cleaned_rule)
+
+def main_chunked(batch_size, workers=1, cache=None, report_format=None, wiki_snapshot=None, system_snapshot=None):
+    """main() over batches of system rules, writing the missing ones as each batch is matched."""
+    law_texts = load_law_texts(cache, wiki_snapshot)
+    with stage('normalize'):
+        cleaned_law_texts = clean_keys(law_texts)
+        known_keys = set(cleaned_law_texts)
+
+    print("\n=== Finding Missing Rules (with similarity check) ===")
+    tiers = TierReport()
+    total_rules = similar_found = missing_count = 0
+    out_path = report_path('missing_rules_with_similarity.xlsx', report_format)
+    with WorkerPool(SimilarityIndex, (cleaned_law_texts,), workers) as pool, ReportWriter(out_path) as writer:
+        sheet = writer.add_sheet('Sheet1', ['Rule Name'])
+        for batch in iter_system_batches(SYSTEM_RULES_URL, batch_size, cache, system_snapshot):
+            with stage('normalize'):
+                parsed_rules = parse_system_rules(batch, name_field=None, normalize=clean_comma_suffixed_key)
+            total_rules += len(parsed_rules)
+
+            # The same tiers as main(), per batch
+            long_rules = [rule for rule in parsed_rules if len(rule.key) >= 5]
+            tiers.add('too short (skipped)', len(parsed_rules) - len(long_rules))
+            with stage('match.exact'):
+                exact_rules, candidate_rules = split_exact_matches(long_rules, known_keys)
+            tiers.add('exact', len(exact_rules))
+            with stage('match.similarity'):
+                similar = pool.map(is_similar_to_any, [rule.key for rule in candidate_rules])
+            similar_found += sum(similar)
+
+            for rule, is_similar in zip(candidate_rules, similar):
+                if not is_similar:
+                    sheet.write_row((rule.raw,))
+                    missing_count += 1
+    count('report.rows', missing_count)
+    tiers.add('similar', similar_found)
+    tiers.add('unresolved (missing)', missing_count)
+
+    print("\nResults:")
+    print(f"Total system rules: {total_rules}")
+    print(f"Similar rules found: {similar_found}")
+    print(f"Missing rules: {missing_count}")
+    tiers.print_summary(total_rules)
+    print(f"✓ Saved {missing_count} missing rules to '{out_path}'")
+
+def main(workers=1, cache=None, report_format=None, wiki_snapshot=None, system_snapshot=None, batch_size=None):
+    if batch_size:
+        return main_chunked(batch_size, workers=workers, cache=cache, report_format=report_format,
+                            wiki_snapshot=wiki_snapshot, system_snapshot=system_snapshot)
+
+    law_texts, system_rules = fetch_inputs(SYSTEM_RULES_URL, cache, wiki_snapshot, system_snapshot)
 
-def main():
-    law_texts = extract_all_rules()
-    
     # Clean law texts
-    cleaned_law_texts = []
-    for text in law_texts:
-        cleaned_text = re.sub(r'[^a-zA-Zא-ת0-9]', '', text)
-        cleaned_law_texts.append(cleaned_text)
-
-    # Fetch system rules
-    print("\n=== Fetching System Rules ===")
-    response = requests.get('https://www.lawdata.co.il/lawdata_face_lift_test/getallhoknamesforcompare.asp')
-    response.encoding = 'utf-8'
-    system_rules = response.text.split('*&*')
+    with stage('normalize'):
+        cleaned_law_texts = clean_keys(law_texts)
     
     print(f"Got {len(system_rules)} system rules")
     
-    # Clean system rules
-    cleaned_system_rules = []
-    for text in system_rules:
-        # Remove year suffix if present
-        text = text.rsplit(',', 1)[0] if ',' in text else text
-        
-        # Remove version text patterns
-        text = re.sub(r'\[נוסח [^\]]*\]', '', text)
-        
-        # Clean to alphanumeric only
-        cleaned_text = re.sub(r'[^a-zA-Zא-ת0-9]', '', text)
-        cleaned_system_rules.append(cleaned_text)
+    # Parse and clean every system rule once
+    with stage('normalize'):
+        parsed_rules = parse_system_rules(system_rules, name_field=None, normalize=clean_comma_suffixed_key)
 
     # Find missing rules with similarity check
     print("\n=== Finding Missing Rules (with similarity check) ===")
-    missing_rules = []
-    similar_found = 0
     
-    for i, cleaned_rule in enumerate(cleaned_system_rules):
-        if len(cleaned_rule) < 5:  # Skip very short rules
-            continue
-            
-        # Check exact match first
-        if cleaned_rule in cleaned_law_texts:
-            continue
-            
-        # Check similarity
-        is_similar = False
-        for existing_rule in cleaned_law_texts:
-            if simple_similarity(cleaned_rule, existing_rule):
-                is_similar = True
-                similar_found += 1
-                break
-        
-        if not is_similar:
-            missing_rules.append(system_rules[i])
+    tiers = TierReport()
+    
+    # Skip very short rules
+    long_rules = [rule for rule in parsed_rules if len(rule.key) >= 5]
+    tiers.add('too short (skipped)', len(parsed_rules) - len(long_rules))
+    
+    # Tier 1: exact match on the cleaned key, one hash lookup per rule
+    with stage('match.exact'):
+        exact_rules, candidate_rules = split_exact_matches(long_rules, set(cleaned_law_texts))
+    tiers.add('exact', len(exact_rules))
+    
+    # Tier 2: similarity check, only for the residue
+    with stage('match.similarity'):
+        similar = parallel_map(is_similar_to_any, [rule.key for rule in candidate_rules], SimilarityIndex,
+                               (cleaned_law_texts,), workers=workers)
+    similar_found = sum(similar)
+    missing_rules = [rule.raw for rule, is_similar in zip(candidate_rules, similar) if not is_similar]
+    tiers.add('similar', similar_found)
+    tiers.add('unresolved (missing)', len(missing_rules))
     
     # Results
     print(f"\nResults:")
     print(f"Total system rules: {len(system_rules)}")
     print(f"Similar rules found: {similar_found}")
     print(f"Missing rules: {len(missing_rules)}")
+    tiers.print_summary(len(parsed_rules))
     
     # Save to Excel
-    df = pd.DataFrame(missing_rules, columns=['Rule Name'])
-    df.to_excel('missing_rules_with_similarity.xlsx', index=False)
+    out_path = report_path('missing_rules_with_similarity.xlsx', report_format)
+    write_report(out_path, ['Rule Name'], ((rule,) for rule in missing_rules))
     
-    print(f"✓ Saved {len(missing_rules)} missing rules to 'missing_rules_with_similarity.xlsx'")
+    print(f"✓ Saved {len(missing_rules)} missing rules to '{out_path}'")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find system rules that are missing from the wiki.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes for the similarity pass")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_chunked_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        main(workers=args.workers, cache=cache_from_args(args), report_format=args.format,
+             wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot,
+             batch_size=batch_size_from_args(args)) 
\ No newline at end of file
@@ -1,47 +1,71 @@
-from extract_rules import WikiRulesExtractor
-import re
-import requests
-import pandas as pd
+from chunked import add_chunked_arguments, batch_size_from_args, iter_system_batches
+from extract_rules import fetch_inputs, load_law_texts
+import argparse
+from contextlib import ExitStack
+from http_cache import add_cache_arguments, cache_from_args
+from instrumentation import add_metrics_arguments, count, instrumented, stage
+from matcher import TierReport, split_exact_matches
+from normalize import normalize_many, normalize_text
+from report_writer import FORMATS, ReportWriter, report_path, write_report
+from snapshot import add_snapshot_arguments
+from system_rules import parse_system_rules
 
-def normalize_text(text):
-    """Normalize text for comparison by removing extra spaces and some punctuation but keeping structure."""
-    # Remove only specific punctuation that might vary
-    text = re.sub(r'["\'\(\)\[\]\{\}]', '', text)
-    # Normalize whitespace
-    text = re.sub(r'\s+', ' ', text)
-    # Remove leading/trailing whitespace
-    text = text.strip()
-    # Convert to lowercase for comparison
-    return text.lower()
+SYSTEM_RULES_URL = 'https://www.lawdata.co.il/getallhoknamesforcompare.asp'
 
-def extract_all_rules():
-    """Extract law-related anchor texts from WikiSource."""
-    print("=== Extracting Wiki Rules ===")
-    
-    # Initialize the extractor
-    url = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
-    extractor = WikiRulesExtractor(url)
-    
-    # Extract law-related anchor texts (now with proper filtering)
-    print("Extracting law-related anchor texts...")
-    law_texts = extractor.extract_all_rules(filter_laws=True)
-    
-    print(f"\nExtracted {len(law_texts)} law-related texts")
-    print("\nFirst 10 examples:")
-    for i, text in enumerate(law_texts[:10], 1):
-        print(f"  {i}. {text}")
-    
-    return law_texts
+def main_chunked(batch_size, cache=None, report_format=None, wiki_snapshot=None, system_snapshot=None):
+    """main() over batches of system rules, writing the missing ones as each batch is matched."""
+    law_texts = load_law_texts(cache, wiki_snapshot)
+    with stage('normalize'):
+        normalized_law_texts = set(text for text in normalize_many(law_texts, normalize_text) if text.strip())
+    print(f"  Wiki law texts: {len(normalized_law_texts)}")
 
-def main():
-    # Extract law texts from wiki
-    law_texts = extract_all_rules()
-    
-    # Fetch system rules
-    print("\n=== Fetching System Rules ===")
-    response = requests.get('https://www.lawdata.co.il/getallhoknamesforcompare.asp')
-    response.encoding = 'utf-8'
-    system_rules = response.text.split('*&*')
+    print("\n=== Finding Matches ===")
+    total_rules = matches_found = missing_count = 0
+    out_path = report_path('missing_rules_fixed.xlsx', report_format)
+    with ExitStack() as stack:
+        sheet = None
+        for batch in iter_system_batches(SYSTEM_RULES_URL, batch_size, cache, system_snapshot):
+            with stage('normalize'):
+                parsed_rules = parse_system_rules(batch, name_field=None, normalize=normalize_text)
+            valid_system_rules = [rule for rule in parsed_rules if rule.key.strip()]
+            total_rules += len(valid_system_rules)
+
+            with stage('match.exact'):
+                exact_rules, unmatched_rules = split_exact_matches(valid_system_rules, normalized_law_texts)
+            for rule in exact_rules[:max(0, 5 - matches_found)]:  # Show first 5 matches
+                print(f"MATCH: {rule.raw}")
+            matches_found += len(exact_rules)
+            if unmatched_rules and sheet is None:
+                # Like main(), only write the report if a rule is missing
+                writer = stack.enter_context(ReportWriter(out_path))
+                sheet = writer.add_sheet('Sheet1', ['Rule Name'])
+            for rule in unmatched_rules:
+                sheet.write_row((rule.raw,))
+            missing_count += len(unmatched_rules)
+    count('report.rows', missing_count)
+
+    tiers = TierReport()
+    tiers.add('exact', matches_found)
+    tiers.add('unresolved (missing)', missing_count)
+
+    print("\n=== Results ===")
+    print(f"Total system rules: {total_rules}")
+    print(f"Matches found: {matches_found}")
+    print(f"Missing rules: {missing_count}")
+    if total_rules:
+        print(f"Match percentage: {matches_found/total_rules*100:.1f}%")
+    tiers.print_summary(total_rules)
+    if missing_count:
+        print(f"\n✓ Saved {missing_count} missing rules to '{out_path}'")
+    else:
+        print("\n✓ No missing rules found!")
+
+def main(cache=None, report_format=None, wiki_snapshot=None, system_snapshot=None, batch_size=None):
+    if batch_size:
+        return main_chunked(batch_size, cache=cache, report_format=report_format,
+                            wiki_snapshot=wiki_snapshot, system_snapshot=system_snapshot)
+
+    law_texts, system_rules = fetch_inputs(SYSTEM_RULES_URL, cache, wiki_snapshot, system_snapshot)
     
     print(f"Got {len(system_rules)} system rules")
     print("\nFirst 5 system rules:")
@@ -50,12 +74,13 @@ def main():
     
     # Normalize both datasets for comparison
     print("\n=== Normalizing Data ===")
-    normalized_law_texts = [normalize_text(text) for text in law_texts]
-    normalized_system_rules = [normalize_text(text) for text in system_rules]
+    with stage('normalize'):
+        normalized_law_texts = normalize_many(law_texts, normalize_text)
+        parsed_rules = parse_system_rules(system_rules, name_field=None, normalize=normalize_text)
     
     # Remove empty entries
     normalized_law_texts = [text for text in normalized_law_texts if text.strip()]
-    valid_system_rules = [(original, normalized) for original, normalized in zip(system_rules, normalized_system_rules) if normalized.strip()]
+    valid_system_rules = [rule for rule in parsed_rules if rule.key.strip()]
     
     print(f"After normalization and filtering:")
     print(f"  Wiki law texts: {len(normalized_law_texts)}")
@@ -63,16 +88,18 @@ def main():
     
     # Find matches and missing rules
     print("\n=== Finding Matches ===")
-    missing_rules = []
-    matches_found = 0
     
-    for original_rule, normalized_rule in valid_system_rules:
-        if normalized_rule in normalized_law_texts:
-            matches_found += 1
-            if matches_found <= 5:  # Show first 5 matches
-                print(f"MATCH: {original_rule}")
-        else:
-            missing_rules.append(original_rule)
+    # Exact match on the normalized key, one hash lookup per rule
+    with stage('match.exact'):
+        exact_rules, unmatched_rules = split_exact_matches(valid_system_rules, set(normalized_law_texts))
+    matches_found = len(exact_rules)
+    for rule in exact_rules[:5]:  # Show first 5 matches
+        print(f"MATCH: {rule.raw}")
+    missing_rules = [rule.raw for rule in unmatched_rules]
+    
+    tiers = TierReport()
+    tiers.add('exact', matches_found)
+    tiers.add('unresolved (missing)', len(missing_rules))
     
     # Results
     print(f"\n=== Results ===")
@@ -80,14 +107,24 @@ def main():
     print(f"Matches found: {matches_found}")
     print(f"Missing rules: {len(missing_rules)}")
     print(f"Match percentage: {matches_found/len(valid_system_rules)*100:.1f}%")
+    tiers.print_summary(len(valid_system_rules))
     
     # Save missing rules to Excel
     if missing_rules:
-        df = pd.DataFrame(missing_rules, columns=['Rule Name'])
-        df.to_excel('missing_rules_fixed.xlsx', index=False)
-        print(f"\n✓ Saved {len(missing_rules)} missing rules to 'missing_rules_fixed.xlsx'")
+        out_path = report_path('missing_rules_fixed.xlsx', report_format)
+        write_report(out_path, ['Rule Name'], ((rule,) for rule in missing_rules))
+        print(f"\n✓ Saved {len(missing_rules)} missing rules to '{out_path}'")
     else:
         print("\n✓ No missing rules found!")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find system rules without an exact match in the wiki.")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_chunked_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        main(cache=cache_from_args(args), report_format=args.format, wiki_snapshot=args.wiki_snapshot,
+             system_snapshot=args.system_snapshot, batch_size=batch_size_from_args(args)) 
\ No newline at end of file
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Crawl the sub-pages and categories linked from the Wikisource law book index.
+
+The index page is read once, the law book links on it are collected, and the
+linked pages are fetched by a bounded thread pool sharing one pooled session.
+A rate limiter spaces out the requests, and the anchor texts of all pages
+are merged into one rule list in link order.
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from urllib.parse import unquote, urldefrag, urljoin, urlparse
+
+import requests
+
+from extract_rules import WikiRulesExtractor
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import make_session
+
+LAW_BOOK_URL = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
+CATEGORY_PREFIX = 'קטגוריה:'
+
+
+class RateLimiter:
+    """Let at most `rate` calls per second through, across all threads."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+
+class LawBookCrawler:
+    """Fetch the law book index and its linked sub-pages concurrently."""
+
+    def __init__(self, index_url: str = LAW_BOOK_URL, max_workers: int = 8,
+                 rate: float = 5.0, include_categories: bool = True, cache=None):
+        self.index_url = index_url
+        self.max_workers = max_workers
+        self.include_categories = include_categories
+        self.cache = cache
+        self.rate_limiter = RateLimiter(rate)
+        # One extractor (and so one session) for all pages, with a pool big enough for the workers
+        self.extractor = WikiRulesExtractor(index_url, cache=cache, session=make_session(pool_size=max_workers))
+
+    def _page_anchors(self, url: str):
+        self.rate_limiter.wait()
+        page = WikiRulesExtractor(url, cache=self.cache, session=self.extractor.session)
+        return list(page.iter_anchors())
+
+    def _linked_page_anchors(self, url: str):
+        # A broken sub-page should not lose the rest of the crawl
+        try:
+            return self._page_anchors(url)
+        except requests.RequestException as e:
+            print(f"Skipping {url}: {e}")
+            return []
+
+    def is_law_book_link(self, url: str) -> bool:
+        """Return True for sub-pages of the index page and, optionally, category pages."""
+        index = urlparse(self.index_url)
+        link = urlparse(url)
+        if link.netloc != index.netloc or link.query:
+            return False
+        if unquote(link.path).startswith(unquote(index.path) + '/'):
+            return True
+        title = unquote(link.path).rsplit('/', 1)[-1]
+        return self.include_categories and title.startswith(CATEGORY_PREFIX)
+
+    def collect_links(self, anchors) -> List[str]:
+        """Return the distinct law book links among the anchors, in page order."""
+        links = []
+        seen = set()
+        for _, href in anchors:
+            if not href:
+                continue
+            url = urldefrag(urljoin(self.index_url, href))[0]
+            if url not in seen and self.is_law_book_link(url):
+                seen.add(url)
+                links.append(url)
+        return links
+
+    def crawl(self) -> List[str]:
+        """Return the anchor texts of the index page and its linked pages, without duplicates."""
+        index_anchors = self._page_anchors(self.index_url)
+        links = self.collect_links(index_anchors)
+        print(f"Found {len(links)} linked law book pages")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # map() keeps link order, so the merged list does not depend on timing
+            pages = list(executor.map(self._linked_page_anchors, links))
+
+        rules = []
+        seen = set()
+        for anchors in [index_anchors] + pages:
+            for text, _ in anchors:
+                if text not in seen:
+                    seen.add(text)
+                    rules.append(text)
+        print(f"Collected {len(rules)} distinct anchor texts from {len(links) + 1} pages")
+        return rules
+
+
+def main(index_url: str = LAW_BOOK_URL, workers: int = 8, rate: float = 5.0,
+         include_categories: bool = True, cache=None, out_path: Optional[str] = 'law_book_texts.txt'):
+    crawler = LawBookCrawler(index_url, max_workers=workers, rate=rate,
+                             include_categories=include_categories, cache=cache)
+    rules = crawler.crawl()
+
+    if out_path:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            for i, text in enumerate(rules, 1):
+                f.write(f"{i}. {text}\n")
+        print(f"✓ Saved {len(rules)} texts to '{out_path}'")
+    return rules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl the Wikisource law book and its sub-pages.")
+    parser.add_argument('--url', default=LAW_BOOK_URL, help="Index page of the law book")
+    parser.add_argument('--workers', type=int, default=8, help="Number of concurrent page fetches")
+    parser.add_argument('--rate', type=float, default=5.0, help="Maximum requests per second")
+    parser.add_argument('--no-categories', action='store_true', help="Do not follow category links")
+    parser.add_argument('--out', default='law_book_texts.txt', help="Output text file")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    main(args.url, workers=args.workers, rate=args.rate, include_categories=not args.no_categories,
+         cache=cache_from_args(args), out_path=args.out)
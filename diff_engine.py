@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bidirectional wiki-vs-system diff in a single pass.
+
+Both sources are fetched and normalized once, every wiki rule is matched
+against the indexed system rules once, and the matched, wiki-only,
+system-only and ambiguous (several close system rules) sets are written
+as sheets of one workbook.
+
+Every sheet uses compare.py's inputs and acceptance rule: the
+getallhoknamesforcompare endpoint (--system-url), the name in field 1
+after compare.py's suffix cleanup, and is_close_match on the edit
+distance. The sheets therefore do not reproduce the other scripts:
+
+- "Wiki Only" is not compareVikiNotInSystem.py's report, which reads the
+  getallrulesnamesforcompare endpoint (laws and regulations) and the name
+  in field 2, without the suffix cleanup;
+- "System Only" is not compare_fast.py's or compare_fixed.py's report,
+  which compare the whole record by character similarity or by exact
+  normalized text rather than by edit distance on the name.
+"""
+
+import argparse
+import os
+from typing import List, NamedTuple, Tuple
+
+from compare import SYSTEM_RULES_URL, clean_law_texts, clean_system_rules
+from extract_rules import fetch_inputs
+from http_cache import add_cache_arguments, cache_from_args
+from instrumentation import add_metrics_arguments, instrumented, stage
+from matcher import FuzzyMatcher, is_close_match
+from parallel import parallel_map
+from report_writer import FORMATS, ReportWriter, report_path
+from normalize import clean_key
+from snapshot import add_snapshot_arguments
+from system_rules import SystemRule, parse_system_rules
+
+
+class RulesDiff(NamedTuple):
+    """Result of diff_rules."""
+    matched: List[Tuple[str, SystemRule, int]]
+    wiki_only: List[str]
+    system_only: List[SystemRule]
+    ambiguous: List[Tuple[str, List[Tuple[SystemRule, int]]]]
+
+
+def build_system_matcher(system_rules: List[SystemRule]):
+    """Index the system rule keys for lookups within edit distance 2."""
+    return FuzzyMatcher([rule.key for rule in system_rules], max_distance=2), system_rules
+
+
+def find_close_rules(state, wiki_text: str) -> List[Tuple[int, int]]:
+    """Return (system rule index, distance) of every system rule close to wiki_text."""
+    matcher, system_rules = state
+    return [(index, distance) for index, distance in matcher.search(clean_key(wiki_text))
+            if is_close_match(distance, len(system_rules[index].name))]
+
+
+def diff_rules(wiki_texts: List[str], system_rules: List[SystemRule], workers: int = 1) -> RulesDiff:
+    """Match every wiki rule against the system rules once and split the results.
+
+    A wiki rule is matched to its first close system rule (the same choice as
+    compare.py); when it has more than one close system rule it is also
+    reported as ambiguous.
+    """
+    close_rules = parallel_map(find_close_rules, wiki_texts, build_system_matcher,
+                               (system_rules,), workers=workers)
+
+    matched = []
+    wiki_only = []
+    ambiguous = []
+    used_system_rules = set()
+    for wiki_text, candidates in zip(wiki_texts, close_rules):
+        if not candidates:
+            wiki_only.append(wiki_text)
+            continue
+        index, distance = candidates[0]
+        matched.append((wiki_text, system_rules[index], distance))
+        used_system_rules.update(index for index, _ in candidates)
+        if len(candidates) > 1:
+            ambiguous.append((wiki_text, [(system_rules[index], distance) for index, distance in candidates]))
+
+    system_only = [rule for index, rule in enumerate(system_rules) if index not in used_system_rules]
+    return RulesDiff(matched, wiki_only, system_only, ambiguous)
+
+
+def write_diff_workbook(diff: RulesDiff, out_path: str):
+    """Write the four result sets as sheets of one Excel workbook (one file per sheet for other formats)."""
+    with stage('write'), ReportWriter(out_path, single_sheet=False) as writer:
+        sheet = writer.add_sheet('Matched', ['Rule Index', 'Rule Name', 'System Name', 'Distance'])
+        for wiki_text, rule, distance in diff.matched:
+            sheet.write_row((rule.rule_id, wiki_text, rule.name, distance))
+
+        sheet = writer.add_sheet('Wiki Only', ['Rule Name'])
+        for wiki_text in diff.wiki_only:
+            sheet.write_row((wiki_text,))
+
+        sheet = writer.add_sheet('System Only', ['Rule Index', 'Rule Name'])
+        for rule in diff.system_only:
+            sheet.write_row((rule.rule_id, rule.name))
+
+        sheet = writer.add_sheet('Ambiguous', ['Rule Name', 'Rule Index', 'System Name', 'Distance'])
+        for wiki_text, candidates in diff.ambiguous:
+            for rule, distance in candidates:
+                sheet.write_row((wiki_text, rule.rule_id, rule.name, distance))
+
+
+def main(workers=1, system_url=SYSTEM_RULES_URL, cache=None, report_format=None,
+         wiki_snapshot=None, system_snapshot=None):
+    # Fetch both sides at once, then normalize them once
+    law_texts, records = fetch_inputs(system_url, cache, wiki_snapshot, system_snapshot)
+    with stage('normalize'):
+        law_texts = clean_law_texts(law_texts)
+        cleaned_system_rules, _ = clean_system_rules(records)
+        system_rules = parse_system_rules(cleaned_system_rules, name_field=1)
+    print(f"Got {len(system_rules)} system rules")
+
+    print("\n=== Matching ===")
+    with stage('match'):
+        diff = diff_rules(law_texts, system_rules, workers=workers)
+
+    print(f"Matched: {len(diff.matched)}")
+    print(f"Wiki rules not in system: {len(diff.wiki_only)}")
+    print(f"System rules not in wiki: {len(diff.system_only)}")
+    print(f"Ambiguous wiki rules: {len(diff.ambiguous)}")
+
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    out_path = report_path(os.path.join(script_dir, "rulesDiff.xlsx"), report_format)
+    write_diff_workbook(diff, out_path)
+    print(f"✓ Saved to {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare wiki and system rules in both directions.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes for the fuzzy pass")
+    parser.add_argument('--system-url', default=SYSTEM_RULES_URL, help="lawdata endpoint with the system rule names")
+    parser.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+    add_cache_arguments(parser)
+    add_snapshot_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        main(workers=args.workers, system_url=args.system_url, cache=cache_from_args(args), report_format=args.format,
+             wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot)
@@ -4,27 +4,126 @@
 Extract all anchor tag text content from Hebrew Wikisource law page.
 """
 
-import requests
-from bs4 import BeautifulSoup
-from typing import List
+from html.parser import HTMLParser
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple
+import argparse
 import time
 import re
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import fetch_concurrently, shared_session
+from instrumentation import add_metrics_arguments, count, instrumented, stage
+
+# requests and bs4 are imported where they are used, so that commands which
+# never download or never build a full tree do not pay for importing them
+if TYPE_CHECKING:
+    import requests
+
+LAW_BOOK_URL = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
+
+
+class AnchorStreamParser(HTMLParser):
+    """Incremental HTML parser collecting (text, href) of anchor tags.
+
+    Feed it the page chunk by chunk and drain the finished anchors with
+    pop_anchors(); only the anchors seen so far are kept in memory. The text
+    of an anchor matches BeautifulSoup's tag.get_text(strip=True).
+    """
+
+    # Tags whose content BeautifulSoup's get_text() leaves out
+    SKIPPED_TAGS = ('script', 'style', 'template')
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchors: List[Tuple[str, Optional[str]]] = []
+        self._href: Optional[str] = None
+        self._in_anchor = False
+        self._strings: List[str] = []
+        # Data of the current text node, which may arrive in several pieces
+        self._node_parts: List[str] = []
+        self._skip_depth = 0
+
+    def _end_text_node(self):
+        if self._node_parts:
+            text = ''.join(self._node_parts).strip()
+            if text:
+                self._strings.append(text)
+            self._node_parts = []
+
+    def _close_anchor(self):
+        self._end_text_node()
+        text = ''.join(self._strings)
+        if text:  # Only include non-empty text
+            self.anchors.append((text, self._href))
+        self._in_anchor = False
+        self._href = None
+        self._strings = []
+
+    def handle_starttag(self, tag, attrs):
+        self._end_text_node()
+        if tag == 'a':
+            if self._in_anchor:
+                # Anchors cannot nest, a new one closes the current one
+                self._close_anchor()
+            self._in_anchor = True
+            self._href = dict(attrs).get('href')
+        elif tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._end_text_node()
+        if tag == 'a' and self._in_anchor:
+            self._close_anchor()
+        elif tag in self.SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._end_text_node()
+
+    def handle_comment(self, data):
+        self._end_text_node()
+
+    def handle_data(self, data):
+        if self._in_anchor and not self._skip_depth:
+            self._node_parts.append(data)
+
+    def close(self):
+        super().close()
+        if self._in_anchor:
+            self._close_anchor()
+
+    def pop_anchors(self) -> List[Tuple[str, Optional[str]]]:
+        """Return and forget the anchors completed so far."""
+        anchors = self.anchors
+        self.anchors = []
+        return anchors
+
+
+def iter_anchors(chunks: Iterable[str]) -> Iterator[Tuple[str, Optional[str]]]:
+    """Yield (text, href) of every anchor with text, while the chunks stream in."""
+    parser = AnchorStreamParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.pop_anchors()
+    parser.close()
+    yield from parser.pop_anchors()
 
 
 class WikiRulesExtractor:
     """Extract rules/laws from Hebrew Wikisource page."""
     
-    def __init__(self, url: str):
+    def __init__(self, url: str, cache=None, session: Optional['requests.Session'] = None):
         self.url = url
-        self.session = requests.Session()
-        # Add headers to mimic a browser request
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        # Optional http_cache.HttpCache used instead of a plain download
+        self.cache = cache
+        # The shared pooled, retrying session sends a browser User-Agent
+        self.session = session if session is not None else shared_session()
         
     def fetch_page_content(self) -> str:
         """Fetch the HTML content of the page."""
+        import requests
         try:
+            if self.cache is not None:
+                return self.cache.get_text(self.url, self.session)
             print(f"Fetching content from: {self.url}")
             response = self.session.get(self.url, timeout=30)
             response.raise_for_status()
@@ -35,8 +134,33 @@ class WikiRulesExtractor:
             print(f"Error fetching page: {e}")
             raise
     
+    def iter_page_chunks(self, chunk_size: int = 64 * 1024) -> Iterator[str]:
+        """Yield the HTML content of the page in decoded chunks as it downloads."""
+        if self.cache is not None:
+            html_content = self.cache.get_text(self.url, self.session)
+            for start in range(0, len(html_content), chunk_size):
+                yield html_content[start:start + chunk_size]
+            return
+
+        print(f"Streaming content from: {self.url}")
+        with self.session.get(self.url, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = 'utf-8'  # Ensure proper Hebrew encoding
+            yield from response.iter_content(chunk_size=chunk_size, decode_unicode=True)
+
+    def iter_anchors(self) -> Iterator[Tuple[str, Optional[str]]]:
+        """Yield (text, href) of the page anchors without building a full document tree."""
+        return iter_anchors(self.iter_page_chunks())
+
+    def extract_anchor_texts_streaming(self) -> List[str]:
+        """Streaming equivalent of fetch_page_content() + extract_anchor_texts()."""
+        anchor_texts = [text for text, _ in self.iter_anchors()]
+        print(f"Found {len(anchor_texts)} anchor tags with text content")
+        return anchor_texts
+
     def extract_anchor_texts(self, html_content: str) -> List[str]:
         """Extract all text content from anchor tags."""
+        from bs4 import BeautifulSoup
         soup = BeautifulSoup(html_content, 'lxml')
         
         # Find all anchor tags
@@ -92,18 +216,27 @@ class WikiRulesExtractor:
         print(f"Filtered to {len(filtered_texts)} law-related anchor texts")
         return filtered_texts
     
-    def extract_all_rules(self, filter_laws: bool = True) -> List[str]:
+    def extract_all_rules(self, filter_laws: bool = True, streaming: bool = False) -> List[str]:
         """Main method to extract all rules/laws from the page."""
         try:
-            # Fetch page content
-            html_content = self.fetch_page_content()
-            
-            # Extract all anchor texts
-            anchor_texts = self.extract_anchor_texts(html_content)
+            if streaming:
+                # Parse the anchors while the page downloads
+                with stage('wiki.fetch+parse'):
+                    anchor_texts = self.extract_anchor_texts_streaming()
+            else:
+                # Fetch page content
+                with stage('wiki.fetch'):
+                    html_content = self.fetch_page_content()
+                
+                # Extract all anchor texts
+                with stage('wiki.parse'):
+                    anchor_texts = self.extract_anchor_texts(html_content)
+            count('wiki.anchors', len(anchor_texts))
             
             if filter_laws:
                 # Filter to get only law-related content
-                rules_vector = self.filter_law_related_links(anchor_texts)
+                with stage('wiki.filter'):
+                    rules_vector = self.filter_law_related_links(anchor_texts)
             else:
                 rules_vector = anchor_texts
             
@@ -114,28 +247,77 @@ class WikiRulesExtractor:
             raise
 
 
-def main():
+def extract_all_rules(cache=None, streaming: bool = False, source: str = 'html') -> List[str]:
+    """Return the filtered law texts of the law book, as used by all comparison scripts.
+
+    source='api' reads the page links through the MediaWiki API instead of the rendered HTML.
+    """
+    print("=== Extracting Wiki Rules ===")
+    if source == 'api':
+        from mediawiki_source import MediaWikiSource
+        with stage('wiki.api'):
+            law_texts = MediaWikiSource.from_page_url(LAW_BOOK_URL).extract_all_rules()
+    else:
+        extractor = WikiRulesExtractor(LAW_BOOK_URL, cache=cache)
+        print("Extracting law-related anchor texts...")
+        law_texts = extractor.extract_all_rules(filter_laws=True, streaming=streaming)
+
+    print(f"\nExtracted {len(law_texts)} law-related texts")
+    print("\nFirst 5 examples:")
+    for i, text in enumerate(law_texts[:5], 1):
+        print(f"  {i}. {text}")
+
+    return law_texts
+
+
+def load_law_texts(cache=None, snapshot: Optional[str] = None) -> List[str]:
+    """Return the law texts from a wiki snapshot (snapshot.py), or extract them from the wiki."""
+    if snapshot:
+        from snapshot import read_texts
+        return read_texts(snapshot, 'wiki', LAW_BOOK_URL)
+    return extract_all_rules(cache)
+
+
+def fetch_inputs(system_url: str, cache=None, wiki_snapshot: Optional[str] = None,
+                 system_snapshot: Optional[str] = None, **rule_options) -> Tuple[List[str], list]:
+    """Return (wiki law texts, system records) of a comparison run.
+
+    Both are fetched at the same time, so a run waits for the slower of the
+    two instead of both in turn. With rule_options (the arguments of
+    system_rules.fetch_rules) the system side is parsed into SystemRule
+    records as it arrives.
+    """
+    from system_rules import fetch_records, fetch_rules
+
+    fetch_system = fetch_rules if rule_options else fetch_records
+    law_texts, system_records = fetch_concurrently(
+        lambda: load_law_texts(cache, wiki_snapshot),
+        lambda: fetch_system(system_url, cache, system_snapshot, **rule_options))
+    return law_texts, system_records
+
+
+def main(cache=None, streaming=False):
     """Main function to demonstrate the extractor."""
-    url = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
+    url = LAW_BOOK_URL
     
     print("Starting Hebrew Wiki Rules Extractor...")
     print("=" * 50)
     
     # Create extractor instance
-    extractor = WikiRulesExtractor(url)
+    extractor = WikiRulesExtractor(url, cache=cache)
     
     # Extract all anchor texts (unfiltered)
     print("\n1. Extracting ALL anchor tag texts:")
-    all_anchor_texts = extractor.extract_all_rules(filter_laws=False)
+    all_anchor_texts = extractor.extract_all_rules(filter_laws=False, streaming=streaming)
     
     print(f"\nFirst 10 anchor texts (out of {len(all_anchor_texts)}):")
     for i, text in enumerate(all_anchor_texts[:10], 1):
         print(f"  {i}. {text}")
     
-    # Extract filtered law-related texts
+    # Filter the same anchor texts instead of downloading the page again
     print("\n" + "=" * 50)
     print("\n2. Extracting FILTERED law-related anchor texts:")
-    law_related_texts = extractor.extract_all_rules(filter_laws=True)
+    law_related_texts = extractor.filter_law_related_links(all_anchor_texts)
     
     print(f"\nFirst 20 law-related texts (out of {len(law_related_texts)}):")
     for i, text in enumerate(law_related_texts[:20], 1):
@@ -163,8 +345,15 @@ def main():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the anchor texts of the Hebrew Wikisource law book.")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Parse the anchors while the page downloads instead of building a full tree")
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
     try:
-        all_texts, law_texts = main()
+        with instrumented(args):
+            all_texts, law_texts = main(cache=cache_from_args(args), streaming=args.streaming)
         print("\n" + "=" * 50)
         print("✓ Extraction completed successfully!")
         print(f"✓ You can now iterate over {len(all_texts)} total anchor texts")
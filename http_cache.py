@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent on-disk HTTP cache for the Wikisource page and the lawdata endpoints.
+
+Response bodies are stored on disk together with their ETag/Last-Modified
+validators. Within the TTL a cached body is returned without any network
+access; after it, the request is revalidated with If-None-Match /
+If-Modified-Since and a 304 answer reuses the stored body. In offline mode
+only the cache is used.
+
+Downloads are streamed into the cache file, so iter_text() never holds a
+whole body in memory, whether it comes from the network or from disk.
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_CACHE_DIR = '.http_cache'
+DEFAULT_TTL = 3600
+
+
+class HttpCache:
+    """Store response bodies on disk and revalidate them with ETag/Last-Modified."""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL, offline: bool = False):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.offline = offline
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        name = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, name)
+        return base + '.body', base + '.json'
+
+    def _load_meta(self, url: str) -> Optional[dict]:
+        body_path, meta_path = self._paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _commit(self, url: str, meta: dict):
+        """Move the body written to the .tmp file into place, together with its meta."""
+        body_path, meta_path = self._paths(url)
+        # The body is downloaded into a temporary file first so an interrupted run never leaves a torn entry
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(body_path + '.tmp', body_path)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _touch(self, url: str, meta: dict):
+        _, meta_path = self._paths(url)
+        meta['fetched_at'] = time.time()
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def get_text(self, url: str, session: Optional['requests.Session'] = None,
+                 timeout: float = 30, encoding: str = 'utf-8') -> str:
+        """Return the body of url, from the cache when it is fresh or still valid."""
+        return ''.join(self.iter_text(url, session, timeout=timeout, encoding=encoding))
+
+    def iter_text(self, url: str, session: Optional['requests.Session'] = None, chunk_size: int = 64 * 1024,
+                  timeout: float = 30, encoding: str = 'utf-8') -> Iterator[str]:
+        """Like get_text(), but yield the body in chunks.
+
+        A download is streamed into the cache file as it is yielded and only
+        moved into place once complete; a cached body is read from disk chunk
+        by chunk.
+        """
+        response = self._request(url, session, timeout)
+        if response is not None:
+            body_path, _ = self._paths(url)
+            with response:
+                response.encoding = encoding
+                with open(body_path + '.tmp', 'w', encoding='utf-8') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size, decode_unicode=True):
+                        f.write(chunk)
+                        yield chunk
+            self._commit(url, {
+                'url': url,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'fetched_at': time.time(),
+            })
+            return
+
+        body_path, _ = self._paths(url)
+        with open(body_path, 'r', encoding='utf-8') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def _request(self, url: str, session: Optional['requests.Session'],
+                 timeout: float) -> Optional['requests.Response']:
+        """Return the streamed response for a new body of url, or None when the cached body is valid."""
+        meta = self._load_meta(url)
+
+        if meta is not None and (self.offline or time.time() - meta['fetched_at'] < self.ttl):
+            print(f"Using cached copy of: {url}")
+            return None
+        if self.offline:
+            raise RuntimeError(f"Offline mode and no cached copy of: {url}")
+
+        headers = {}
+        if meta is not None:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        if session is None:
+            from http_client import shared_session
+            session = shared_session()
+        response = session.get(url, headers=headers, timeout=timeout, stream=True)
+
+        if response.status_code == 304 and meta is not None:
+            print(f"Cached copy still valid: {url}")
+            response.close()
+            self._touch(url, meta)
+            return None
+
+        try:
+            response.raise_for_status()
+        except Exception:
+            response.close()
+            raise
+        return response
+
+
+def add_cache_arguments(parser):
+    """Add the --cache-dir/--cache-ttl/--offline options to an argparse parser."""
+    parser.add_argument('--cache-dir', default=None,
+                        help=f"Cache fetched pages on disk in this directory (e.g. {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL,
+                        help="Seconds a cached page is used without revalidation")
+    parser.add_argument('--offline', action='store_true', help="Only use cached pages, never the network")
+
+
+def cache_from_args(args) -> Optional[HttpCache]:
+    """Build the HttpCache requested on the command line, or None."""
+    cache_dir = args.cache_dir
+    if cache_dir is None and args.offline:
+        cache_dir = DEFAULT_CACHE_DIR
+    if cache_dir is None:
+        return None
+    return HttpCache(cache_dir, ttl=args.cache_ttl, offline=args.offline)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Shared HTTP session for the Wikisource page and the lawdata endpoints.
+
+shared_session() returns one requests.Session per process with:
+
+- keep-alive connection pools (one per host), so repeated fetches and the
+  crawler's threads reuse their connections;
+- bounded retries with exponential backoff on connection errors and on
+  429/5xx answers of GET requests, honouring Retry-After;
+- compressed transfers: gzip and deflate always, br when a brotli decoder
+  (brotli or brotlicffi) is installed, since urllib3 only decodes br then.
+
+Callers still pass stream=True and a timeout per request. fetch_concurrently()
+runs the wiki and the system fetch of a compare run side by side, so the
+fetch latency is the slower of the two instead of their sum.
+"""
+
+import threading
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_shared_session: Optional['requests.Session'] = None
+_shared_lock = threading.Lock()
+
+
+def accept_encoding() -> str:
+    """Return the Accept-Encoding value for the compressions urllib3 can decode here."""
+    encodings = ['gzip', 'deflate']
+    for module in ('brotli', 'brotlicffi'):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+        encodings.append('br')
+        break
+    return ', '.join(encodings)
+
+
+def make_session(pool_size: int = DEFAULT_POOL_SIZE, retries: int = DEFAULT_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF) -> 'requests.Session':
+    """Return a new pooled, retrying session (e.g. for a crawler that needs a bigger pool)."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=frozenset(['GET', 'HEAD']),
+                  # The last 5xx answer is returned, so raise_for_status() reports it as before
+                  raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'User-Agent': USER_AGENT, 'Accept-Encoding': accept_encoding()})
+    return session
+
+
+def shared_session() -> 'requests.Session':
+    """Return the process-wide session, creating it on first use."""
+    global _shared_session
+    with _shared_lock:
+        if _shared_session is None:
+            _shared_session = make_session()
+        return _shared_session
+
+
+def fetch_concurrently(*calls: Callable[[], object]) -> List[object]:
+    """Run the calls in threads and return their results in order.
+
+    Meant for I/O-bound fetches; the first exception raised by a call is
+    re-raised once all calls have finished.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+
+    # Imported here so that scripts which never fetch do not pay for concurrent.futures
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(calls)) as executor:
+        futures = [executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
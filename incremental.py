@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental wiki-vs-system matching backed by a local SQLite state file.
+
+The previous wiki rule list, system rule list and match results are kept in
+the state file. A new run diffs the fresh inputs against that snapshot and
+only re-matches the wiki rules that can be affected:
+
+- wiki rules that were not in the previous run,
+- wiki rules whose matched system rule was removed,
+- wiki rules close to an added system rule (it may now be their first match).
+
+Removed wiki rules are dropped. If the relative order of the unchanged system
+rules changed, the first-match choice can change everywhere, so everything is
+re-matched.
+"""
+
+import sqlite3
+from typing import Dict, List, Optional
+
+from matcher import FuzzyMatcher, is_close_match
+from normalize import clean_key, clean_keys
+from system_rules import SystemRule
+
+
+class StateStore:
+    """SQLite file holding the inputs and results of the previous run."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS wiki_rules (position INTEGER PRIMARY KEY, text TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS system_rules (
+                position INTEGER PRIMARY KEY, raw TEXT NOT NULL, rule_id TEXT NOT NULL,
+                name TEXT NOT NULL, key TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS matches (wiki_text TEXT PRIMARY KEY, system_raw TEXT);
+        ''')
+
+    def load_wiki_rules(self) -> List[str]:
+        return [row[0] for row in self.connection.execute('SELECT text FROM wiki_rules ORDER BY position')]
+
+    def load_system_rules(self) -> List[SystemRule]:
+        return [SystemRule(*row) for row in self.connection.execute(
+            'SELECT raw, rule_id, name, key FROM system_rules ORDER BY position')]
+
+    def load_matches(self) -> Dict[str, Optional[str]]:
+        """Return wiki text -> raw record of its matched system rule (None if unmatched)."""
+        return dict(self.connection.execute('SELECT wiki_text, system_raw FROM matches'))
+
+    def save(self, wiki_texts: List[str], system_rules: List[SystemRule],
+             updated_matches: Dict[str, Optional[str]], removed_wiki_texts: List[str]):
+        """Store the new inputs and apply the match changes in one transaction."""
+        with self.connection:
+            self.connection.execute('DELETE FROM wiki_rules')
+            self.connection.executemany('INSERT INTO wiki_rules VALUES (?, ?)', enumerate(wiki_texts))
+            self.connection.execute('DELETE FROM system_rules')
+            self.connection.executemany('INSERT INTO system_rules VALUES (?, ?, ?, ?, ?)',
+                                        [(position,) + tuple(rule) for position, rule in enumerate(system_rules)])
+            self.connection.executemany('DELETE FROM matches WHERE wiki_text = ?',
+                                        [(text,) for text in removed_wiki_texts])
+            self.connection.executemany('INSERT OR REPLACE INTO matches VALUES (?, ?)', updated_matches.items())
+
+    def close(self):
+        self.connection.close()
+
+
+def _first_close_rule(matcher: FuzzyMatcher, system_rules: List[SystemRule], wiki_text: str) -> Optional[str]:
+    for index, distance in matcher.search(clean_key(wiki_text)):
+        if is_close_match(distance, len(system_rules[index].name)):
+            return system_rules[index].raw
+    return None
+
+
+def incremental_match(store: StateStore, wiki_texts: List[str],
+                      system_rules: List[SystemRule]) -> Dict[str, Optional[SystemRule]]:
+    """Return wiki text -> first close system rule (or None), re-matching only what changed."""
+    previous_wiki = set(store.load_wiki_rules())
+    previous_system = store.load_system_rules()
+    matches = store.load_matches()
+
+    current_wiki = set(wiki_texts)
+    current_raws = {rule.raw for rule in system_rules}
+    previous_raws = {rule.raw for rule in previous_system}
+    added_rules = [rule for rule in system_rules if rule.raw not in previous_raws]
+    removed_raws = previous_raws - current_raws
+
+    kept_order = [rule.raw for rule in system_rules if rule.raw in previous_raws]
+    previous_order = [rule.raw for rule in previous_system if rule.raw in current_raws]
+
+    if kept_order != previous_order:
+        print("System rule order changed, re-matching everything")
+        to_match = current_wiki
+    else:
+        to_match = {text for text in current_wiki if text not in previous_wiki or text not in matches}
+        to_match.update(text for text in current_wiki if matches.get(text) in removed_raws)
+        if added_rules:
+            # Reverse lookup: which wiki rules are close to an added system rule
+            wiki_list = sorted(current_wiki)
+            wiki_matcher = FuzzyMatcher(clean_keys(wiki_list), max_distance=2)
+            for rule in added_rules:
+                for index, distance in wiki_matcher.search(rule.key):
+                    if is_close_match(distance, len(rule.name)):
+                        to_match.add(wiki_list[index])
+
+    removed_wiki = [text for text in matches if text not in current_wiki]
+    print(f"Wiki rules: +{len(current_wiki - previous_wiki)} -{len(removed_wiki)}, "
+          f"system rules: +{len(added_rules)} -{len(removed_raws)}, re-matching {len(to_match)}")
+
+    updated = {}
+    if to_match:
+        matcher = FuzzyMatcher([rule.key for rule in system_rules], max_distance=2)
+        for text in to_match:
+            updated[text] = _first_close_rule(matcher, system_rules, text)
+
+    store.save(wiki_texts, system_rules, updated, removed_wiki)
+    for text in removed_wiki:
+        del matches[text]
+    matches.update(updated)
+
+    rules_by_raw = {rule.raw: rule for rule in system_rules}
+    return {text: rules_by_raw.get(matches[text]) for text in current_wiki}
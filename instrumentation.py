@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stage timers and counters shared by the extractor and the comparison scripts.
+
+Code reports through the module-level `metrics`:
+
+    with stage('wiki.parse'):
+        ...
+    count('match.distance_calls', n)
+
+Timers and counters are always collected (a perf_counter call per stage and
+a dict update per count, done once per lookup rather than per pair); they
+are only printed and written when a script runs with --metrics-json.
+--profile runs the whole command under cProfile or pyinstrument.
+"""
+
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class Metrics:
+    """Wall time per named stage and integer counters."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.counters: Counter = Counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Add the wall time of the with-block to the stage's total."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] += amount
+
+    def merge_counters(self, counters: Dict[str, int]):
+        """Add counters collected elsewhere, e.g. in a worker process."""
+        self.counters.update(counters)
+
+    def reset(self):
+        self.stages.clear()
+        self.counters.clear()
+
+    def summary(self) -> dict:
+        return {'stages': {name: dict(entry) for name, entry in self.stages.items()},
+                'counters': dict(self.counters)}
+
+    def print_summary(self):
+        print("\n=== Metrics ===")
+        for name, entry in self.stages.items():
+            print(f"  {name:28s} {entry['seconds']:9.3f}s  ({entry['calls']} calls)")
+        for name, value in sorted(self.counters.items()):
+            print(f"  {name:28s} {value:,d}")
+
+    def write_json(self, path: str):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+
+metrics = Metrics()
+stage = metrics.stage
+count = metrics.count
+
+
+def add_metrics_arguments(parser):
+    """Add the --metrics-json / --profile options to an argparse parser."""
+    parser.add_argument('--metrics-json', default=None,
+                        help="Print the stage timings and counters and save them to this JSON file")
+    parser.add_argument('--profile', choices=('cprofile', 'pyinstrument'), default=None,
+                        help="Run the command under a profiler")
+    parser.add_argument('--profile-out', default=None,
+                        help="Profile output (default: profile.prof for cProfile, profile.html for pyinstrument)")
+
+
+@contextmanager
+def profiled(profiler: Optional[str], out_path: Optional[str] = None):
+    """Run the with-block under cProfile or pyinstrument (no-op when profiler is None)."""
+    if profiler is None:
+        yield
+        return
+
+    if profiler == 'cprofile':
+        import cProfile
+        import pstats
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            out_path = out_path or 'profile.prof'
+            profile.dump_stats(out_path)
+            pstats.Stats(profile).sort_stats('cumulative').print_stats(20)
+            print(f"✓ Saved cProfile stats to '{out_path}'")
+    else:
+        from pyinstrument import Profiler
+
+        profile = Profiler()
+        profile.start()
+        try:
+            yield
+        finally:
+            profile.stop()
+            out_path = out_path or 'profile.html'
+            with open(out_path, 'w', encoding='utf-8') as f:
+                f.write(profile.output_html())
+            print(profile.output_text(unicode=True))
+            print(f"✓ Saved pyinstrument report to '{out_path}'")
+
+
+@contextmanager
+def instrumented(args):
+    """Apply the options of add_metrics_arguments() around a command."""
+    metrics.reset()
+    with profiled(args.profile, args.profile_out):
+        with stage('total'):
+            yield
+    if args.metrics_json:
+        metrics.print_summary()
+        metrics.write_json(args.metrics_json)
+        print(f"✓ Saved metrics to '{args.metrics_json}'")
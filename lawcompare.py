@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Single entry point for all comparison modes.
+
+    python lawcompare.py fetch|existing|missing-in-system|missing-in-wiki|suffix-report|diff|serve [options]
+
+Every subcommand imports its script only when it runs, and the scripts
+import requests, bs4 and Levenshtein only where they are used, so e.g.
+"missing-in-wiki --exact" never loads Levenshtein and a cached or streaming
+run never loads bs4. The individual scripts can still be run directly.
+"""
+
+import argparse
+
+from chunked import add_chunked_arguments, batch_size_from_args
+from http_cache import add_cache_arguments, cache_from_args
+from instrumentation import add_metrics_arguments, instrumented
+from report_writer import FORMATS
+from snapshot import add_snapshot_arguments
+
+
+def run_fetch(args):
+    from extract_rules import extract_all_rules
+
+    law_texts = extract_all_rules(cache_from_args(args), streaming=args.streaming, source=args.source)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        for i, text in enumerate(law_texts, 1):
+            f.write(f"{i}. {text}\n")
+    print(f"✓ Saved {len(law_texts)} law-related texts to '{args.out}'")
+    if args.snapshot:
+        from extract_rules import LAW_BOOK_URL
+        from snapshot import write_snapshot
+
+        write_snapshot(args.snapshot, law_texts, 'wiki', LAW_BOOK_URL)
+        print(f"✓ Saved the wiki snapshot to '{args.snapshot}'")
+
+
+def run_existing(args):
+    import compare
+
+    compare.main(workers=args.workers, cache=cache_from_args(args), state_db=args.state_db,
+                 best_match=args.best_match, report_format=args.format, blocking=args.blocking,
+                 wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot,
+                 batch_size=batch_size_from_args(args))
+
+
+def run_missing_in_system(args):
+    import compareVikiNotInSystem
+
+    compareVikiNotInSystem.main(workers=args.workers, cache=cache_from_args(args), state_db=args.state_db,
+                                report_format=args.format, wiki_snapshot=args.wiki_snapshot,
+                                system_snapshot=args.system_snapshot, batch_size=batch_size_from_args(args))
+
+
+def run_missing_in_wiki(args):
+    if args.exact:
+        import compare_fixed
+
+        compare_fixed.main(cache=cache_from_args(args), report_format=args.format,
+                           wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot,
+                           batch_size=batch_size_from_args(args))
+    else:
+        import compare_fast
+
+        compare_fast.main(workers=args.workers, cache=cache_from_args(args), report_format=args.format,
+                          wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot,
+                          batch_size=batch_size_from_args(args))
+
+
+def run_suffix_report(args):
+    import compare
+
+    compare.suffix_report(cache=cache_from_args(args), report_format=args.format,
+                          system_snapshot=args.system_snapshot, batch_size=batch_size_from_args(args))
+
+
+def run_diff(args):
+    import diff_engine
+
+    diff_engine.main(workers=args.workers, system_url=args.system_url or diff_engine.SYSTEM_RULES_URL,
+                     cache=cache_from_args(args), report_format=args.format,
+                     wiki_snapshot=args.wiki_snapshot, system_snapshot=args.system_snapshot)
+
+
+def run_serve(args):
+    import match_server
+
+    match_server.main(args.url or match_server.SYSTEM_RULES_URL, host=args.host, port=args.port,
+                      reload_interval=args.reload_interval, cache=cache_from_args(args))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compare the Wikisource law book with the lawdata system rules.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_command(name, func, help_text, workers=False, report=True, chunked=False):
+        command = subparsers.add_parser(name, help=help_text, description=help_text)
+        command.set_defaults(func=func)
+        if workers:
+            command.add_argument('--workers', type=int, default=1, help="Number of worker processes")
+        if report:
+            command.add_argument('--format', choices=FORMATS, default=None, help="Report format (default: xlsx)")
+            # Every report command reads both lists, so it can read them from snapshots
+            add_snapshot_arguments(command)
+        if chunked:
+            add_chunked_arguments(command)
+        add_cache_arguments(command)
+        add_metrics_arguments(command)
+        return command
+
+    fetch = add_command('fetch', run_fetch, "Extract the law texts of the wiki law book", report=False)
+    fetch.add_argument('--source', choices=('html', 'api'), default='html',
+                       help="Read the rendered page or the links through the MediaWiki API")
+    fetch.add_argument('--streaming', action='store_true',
+                       help="Parse the anchors while the page downloads instead of building a full tree")
+    fetch.add_argument('--out', default='law_related_texts.txt', help="Output text file")
+    fetch.add_argument('--snapshot', default=None, help="Also save the texts as a wiki snapshot (see snapshot.py)")
+
+    existing = add_command('existing', run_existing, "Find wiki rules that exist in the system", workers=True,
+                           chunked=True)
+    existing.add_argument('--state-db', default=None,
+                          help="SQLite file with the previous run, to only re-match changed rules")
+    existing.add_argument('--best-match', action='store_true',
+                          help="Report the closest system rule instead of the first close one in list order")
+    existing.add_argument('--blocking', action='store_true',
+                          help="Only compare rules sharing a blocking key (faster, may miss matches)")
+
+    missing_in_system = add_command('missing-in-system', run_missing_in_system,
+                                    "Find wiki rules that are not in the system", workers=True,
+                                    chunked=True)
+    missing_in_system.add_argument('--state-db', default=None,
+                                   help="SQLite file with the previous run, to only re-match changed rules")
+
+    missing_in_wiki = add_command('missing-in-wiki', run_missing_in_wiki,
+                                  "Find system rules that are not in the wiki", workers=True, chunked=True)
+    missing_in_wiki.add_argument('--exact', action='store_true',
+                                 help="Only compare normalized texts exactly (compare_fixed.py)")
+
+    add_command('suffix-report', run_suffix_report, "Report the system rules with a special year suffix",
+                chunked=True)
+
+    diff = add_command('diff', run_diff, "Write the full matched / wiki only / system only diff", workers=True)
+    diff.add_argument('--system-url', default=None, help="lawdata endpoint with the system rule names")
+
+    serve = add_command('serve', run_serve, "Serve lookups against a warm index of the system rules", report=False)
+    serve.add_argument('--url', default=None, help="lawdata endpoint with the system rule names")
+    serve.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    serve.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    serve.add_argument('--reload-interval', type=float, default=600,
+                       help="Seconds between background reloads of the rules (0 to disable)")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    with instrumented(args):
+        args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Local HTTP service answering "is this law already in the system?".
+
+The system rules are loaded once at startup from the lawdata endpoint (or
+the local HTTP cache, e.g. with --offline) into a FuzzyMatcher, using the
+same cleanup and acceptance rule as compareVikiNotInSystem.py. A background
+thread re-fetches the rules every --reload-interval seconds and swaps in a
+new index only when the records changed; lookups keep using the previous
+index meanwhile, and a failed reload keeps it too.
+
+    GET  /lookup?title=<title>     -> {"title", "in_system", "rule"}
+    POST /lookup {"titles": [...]} -> {"results": [...]}
+    GET  /health                   -> number of rules, version and load time
+    POST /reload                   -> reload now
+
+--url points the service at another endpoint, e.g. a local stub.
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from compareVikiNotInSystem import SYSTEM_RULES_URL, build_system_matcher, clean_system_record
+from http_cache import add_cache_arguments, cache_from_args
+from matcher import is_close_match
+from normalize import clean_key, clean_wiki_title
+from system_rules import SystemRule, SystemRulesClient
+
+MAX_BATCH = 10000
+
+
+class RuleIndex:
+    """Immutable FuzzyMatcher over one version of the system rules."""
+
+    def __init__(self, parsed_rules: List[SystemRule]):
+        self.version = hashlib.sha256('\x00'.join(rule.raw for rule in parsed_rules).encode('utf-8')).hexdigest()[:16]
+        self.loaded_at = time.time()
+        self.matcher, self.rules = build_system_matcher(parsed_rules)
+
+    def lookup(self, title: str) -> dict:
+        """Return the first close system rule of a wiki title, as compareVikiNotInSystem.py decides."""
+        for index, distance in self.matcher.search(clean_key(clean_wiki_title(title))):
+            rule = self.rules[index]
+            if is_close_match(distance, len(rule.name)):
+                return {'title': title, 'in_system': True,
+                        'rule': {'id': rule.rule_id, 'name': rule.name, 'distance': distance}}
+        return {'title': title, 'in_system': False, 'rule': None}
+
+
+class MatchService:
+    """Keep a warm RuleIndex and reload it in the background."""
+
+    def __init__(self, url: str = SYSTEM_RULES_URL, cache=None, reload_interval: float = 600):
+        self.url = url
+        self.cache = cache
+        self.reload_interval = reload_interval
+        self.index: Optional[RuleIndex] = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def reload(self) -> bool:
+        """Fetch the rules and swap in a new index if they changed; return True if swapped."""
+        with self._reload_lock:
+            client = SystemRulesClient(self.url, cache=self.cache)
+            index = RuleIndex(list(client.iter_rules(name_field=2, preprocess=clean_system_record)))
+            if self.index is not None and self.index.version == index.version:
+                return False
+            # A single assignment, so running lookups see either the old or the new index
+            self.index = index
+            print(f"Loaded {len(index.rules)} system rules (version {index.version})")
+            return True
+
+    def _reload_loop(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"Reload failed, keeping the current index: {e}")
+
+    def start(self):
+        """Load the index and start the background reloads."""
+        self.reload()
+        if self.reload_interval > 0:
+            self._thread = threading.Thread(target=self._reload_loop, name='rule-reloader', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def health(self) -> dict:
+        index = self.index
+        return {'rules': len(index.rules), 'version': index.version, 'loaded_at': index.loaded_at, 'url': self.url}
+
+
+class MatchRequestHandler(BaseHTTPRequestHandler):
+    """JSON API of a MatchService (set as the server's `service` attribute)."""
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> object:
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length).decode('utf-8')) if length else {}
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path == '/health':
+            self._send_json(200, service.health())
+        elif url.path == '/lookup':
+            titles = parse_qs(url.query).get('title')
+            if not titles:
+                self._send_json(400, {'error': "missing 'title' parameter"})
+                return
+            self._send_json(200, service.index.lookup(titles[0]))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path == '/reload':
+            try:
+                changed = service.reload()
+            except Exception as e:
+                self._send_json(502, {'error': f"reload failed: {e}"})
+                return
+            self._send_json(200, dict(service.health(), changed=changed))
+        elif path == '/lookup':
+            try:
+                data = self._read_json()
+            except ValueError:
+                self._send_json(400, {'error': 'invalid JSON body'})
+                return
+            # Any JSON value parses, so e.g. a list or null must not reach .get()
+            titles = data.get('titles') if isinstance(data, dict) else None
+            if not isinstance(titles, list) or not all(isinstance(title, str) for title in titles):
+                self._send_json(400, {'error': "expected {\"titles\": [...]}"})
+                return
+            if len(titles) > MAX_BATCH:
+                self._send_json(413, {'error': f"at most {MAX_BATCH} titles per request"})
+                return
+            # One index for the whole batch, even if a reload lands in the middle
+            index = service.index
+            self._send_json(200, {'version': index.version, 'results': [index.lookup(title) for title in titles]})
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        # Keep the console for load/reload messages
+        pass
+
+
+def make_server(service: MatchService, host: str = '127.0.0.1', port: int = 8765) -> ThreadingHTTPServer:
+    """Return an HTTP server for an already started service (port 0 picks a free port)."""
+    server = ThreadingHTTPServer((host, port), MatchRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def main(url: str = SYSTEM_RULES_URL, host: str = '127.0.0.1', port: int = 8765,
+         reload_interval: float = 600, cache=None):
+    service = MatchService(url, cache=cache, reload_interval=reload_interval)
+    service.start()
+    server = make_server(service, host, port)
+    print(f"✓ Serving lookups on http://{server.server_address[0]}:{server.server_address[1]}/lookup")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve wiki-rule lookups against a warm index of the system rules.")
+    parser.add_argument('--url', default=SYSTEM_RULES_URL, help="lawdata endpoint with the system rule names")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8765, help="Port to listen on")
+    parser.add_argument('--reload-interval', type=float, default=600,
+                        help="Seconds between background reloads of the rules (0 to disable)")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    main(args.url, host=args.host, port=args.port, reload_interval=args.reload_interval,
+         cache=cache_from_args(args))
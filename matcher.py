@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Indexed fuzzy matcher for cleaned law names.
+
+Instead of computing the edit distance of every (wiki rule, system rule)
+pair, the system names are indexed once by length and by segment
+(a PassJoin style pigeonhole index): a string of length L is cut into
+max_distance + 1 segments, and any string within max_distance edits of it
+must contain at least one of those segments unchanged, shifted by at most
+max_distance positions. A lookup therefore only verifies the handful of
+candidates that share such a segment, and returns exactly the same matches
+as the exhaustive Levenshtein loop.
+"""
+
+from typing import Callable, Dict, List, Set, Tuple
+import heapq
+
+from instrumentation import metrics
+
+
+def is_close_match(distance: int, name_length: int) -> bool:
+    """Acceptance rule of the comparison scripts for a system name of the given length."""
+    # Only consider strings longer than 5 characters
+    return (distance < 3 and name_length > 20) or (distance < 2 and name_length > 5)
+
+
+def bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance of a and b, or max_distance + 1 once it is known to exceed max_distance.
+
+    Only the diagonal band of width 2 * max_distance + 1 is computed, and the
+    computation stops as soon as a whole row of the band exceeds the cut-off.
+    """
+    too_far = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return too_far
+    if len(a) > len(b):
+        a, b = b, a
+
+    length = len(b)
+    previous = [j if j <= max_distance else too_far for j in range(length + 1)]
+    for i in range(1, len(a) + 1):
+        char = a[i - 1]
+        low = max(1, i - max_distance)
+        high = min(length, i + max_distance)
+        current = [too_far] * (length + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[low - 1]
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if value > too_far:
+                value = too_far
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            # Distances never decrease along a path, so the cut-off can no longer be met
+            return too_far
+        previous = current
+    return min(previous[length], too_far)
+
+
+class FuzzyMatcher:
+    """Index a list of keys for "edit distance <= max_distance" lookups."""
+
+    def __init__(self, keys: List[str], max_distance: int = 2):
+        self.keys = list(keys)
+        self.max_distance = max_distance
+        self.parts = max_distance + 1
+        # (length, segment number, segment text) -> indexes of keys
+        self.segments: Dict[Tuple[int, int, str], List[int]] = {}
+        # Keys too short to be cut into non-empty segments, by length
+        self.short_keys: Dict[int, List[int]] = {}
+
+        for index, key in enumerate(self.keys):
+            length = len(key)
+            if length < self.parts:
+                self.short_keys.setdefault(length, []).append(index)
+                continue
+            for part, (start, size) in enumerate(self._segment_bounds(length)):
+                entry = (length, part, key[start:start + size])
+                self.segments.setdefault(entry, []).append(index)
+
+    def _segment_bounds(self, length: int) -> List[Tuple[int, int]]:
+        """Return (start, size) of each segment for a key of the given length."""
+        base, extra = divmod(length, self.parts)
+        bounds = []
+        start = 0
+        for part in range(self.parts):
+            # The last `extra` segments are one character longer
+            size = base + 1 if part >= self.parts - extra else base
+            bounds.append((start, size))
+            start += size
+        return bounds
+
+    def candidates(self, query: str, max_distance: int = None) -> List[int]:
+        """Return indexes of keys that may be within max_distance of query."""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        query_length = len(query)
+        found = set()
+        for length in range(max(0, query_length - max_distance), query_length + max_distance + 1):
+            if length < self.parts:
+                found.update(self.short_keys.get(length, ()))
+                continue
+            for part, (start, size) in enumerate(self._segment_bounds(length)):
+                first = max(0, start - max_distance)
+                last = min(query_length - size, start + max_distance)
+                for position in range(first, last + 1):
+                    entry = (length, part, query[position:position + size])
+                    found.update(self.segments.get(entry, ()))
+        # Pairs the index ruled out without computing a distance
+        metrics.count('match.queries')
+        metrics.count('match.pairs_pruned', len(self.keys) - len(found))
+        return sorted(found)
+
+    def search(self, query: str, max_distance: int = None) -> List[Tuple[int, int]]:
+        """Return (index, distance) of every key within max_distance of query, in key order."""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        # Imported here so the exact-only scripts never load Levenshtein
+        from Levenshtein import distance as levenshtein_distance
+
+        matches = []
+        candidates = self.candidates(query, max_distance)
+        for index in candidates:
+            distance = levenshtein_distance(self.keys[index], query)
+            if distance <= max_distance:
+                matches.append((index, distance))
+        metrics.count('match.distance_calls', len(candidates))
+        return matches
+
+    def top_k(self, query: str, k: int = 1, max_distance: int = None,
+              accept: Callable[[int, int], bool] = None) -> List[Tuple[int, int]]:
+        """Return the k best (index, distance) pairs within max_distance, closest first.
+
+        Ties are broken by key order, so the result does not depend on the
+        order the candidates are visited in. Once k matches are held, the
+        distance cut-off drops to the worst of them, and bounded_distance()
+        gives up on a candidate as soon as it cannot beat that cut-off.
+        accept(index, distance) can reject a candidate, e.g. by name length.
+        """
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        # Max-heap of the best matches so far, as (-distance, -index, index)
+        best = []
+        cutoff = max_distance
+        distance_calls = early_exits = 0
+        for index in self.candidates(query, max_distance):
+            distance = bounded_distance(self.keys[index], query, cutoff)
+            distance_calls += 1
+            if distance > cutoff:
+                early_exits += 1
+                continue
+            if accept is not None and not accept(index, distance):
+                continue
+            heapq.heappush(best, (-distance, -index, index))
+            if len(best) > k:
+                heapq.heappop(best)
+            if len(best) == k:
+                # Candidates come in index order, so a later tie with the worst match loses
+                cutoff = -best[0][0] - 1
+                if cutoff < 0:
+                    break
+        metrics.count('match.distance_calls', distance_calls)
+        metrics.count('match.early_exits', early_exits)
+        return sorted(((index, -negative_distance) for negative_distance, _, index in best),
+                      key=lambda match: (match[1], match[0]))
+
+
+class TierReport:
+    """Number of rules resolved by each matching tier, in tier order."""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+
+    def add(self, tier: str, count: int):
+        self.counts[tier] = self.counts.get(tier, 0) + count
+
+    def print_summary(self, total: int):
+        print("Rules resolved per tier:")
+        for tier, count in self.counts.items():
+            share = count / total * 100 if total else 0.0
+            print(f"  {tier}: {count} ({share:.1f}%)")
+
+
+def split_exact_matches(rules: list, known_keys: Set[str]) -> Tuple[list, list]:
+    """Split rules (anything with a .key) into (exact key matches, residue) with one hash lookup each."""
+    exact = []
+    residue = []
+    for rule in rules:
+        if rule.key in known_keys:
+            exact.append(rule)
+        else:
+            residue.append(rule)
+    return exact, residue
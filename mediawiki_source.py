@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MediaWiki API source for the law book, as an alternative to the rendered HTML.
+
+The page's wikitext (or its prop=links list, with continuation paging) is a
+fraction of the size of the rendered page and has none of the skin,
+navigation and sidebar links, and the [[...]] links can be parsed with a
+single regular expression instead of a full HTML tree.
+
+With a fixture directory the API responses can be recorded to JSON files and
+replayed later without network access.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+from urllib.parse import unquote, urlparse
+
+if TYPE_CHECKING:
+    import requests
+
+LAW_BOOK_URL = "https://he.wikisource.org/wiki/%D7%A1%D7%A4%D7%A8_%D7%94%D7%97%D7%95%D7%A7%D7%99%D7%9D_%D7%94%D7%A4%D7%AA%D7%95%D7%97"
+
+# [[target]] or [[target|label]]
+_WIKI_LINK = re.compile(r'\[\[([^\[\]|]+)(?:\|([^\[\]]*))?\]\]')
+_BOLD_ITALIC = re.compile(r"'{2,}")
+
+# Namespaces whose links are not law titles (Hebrew and English names)
+SKIPPED_NAMESPACES = {
+    'קטגוריה', 'category', 'קובץ', 'file', 'תמונה', 'image', 'תבנית', 'template',
+    'ויקיטקסט', 'wikisource', 'משתמש', 'user', 'עזרה', 'help', 'מדיה', 'media',
+    'מיוחד', 'special', 'w', 'wikt', 's',
+}
+
+
+def parse_wikitext_links(wikitext: str) -> List[str]:
+    """Return the display text of every [[...]] link to a regular page, in order."""
+    texts = []
+    for match in _WIKI_LINK.finditer(wikitext):
+        target, label = match.group(1).strip(), match.group(2)
+        if target.startswith(':'):
+            continue
+        if ':' in target and target.split(':', 1)[0].strip().lower() in SKIPPED_NAMESPACES:
+            continue
+        text = label if label is not None else target
+        text = _BOLD_ITALIC.sub('', text).strip()
+        if text:
+            texts.append(text)
+    return texts
+
+
+class MediaWikiSource:
+    """Read a page's links through the MediaWiki API."""
+
+    def __init__(self, api_url: str, title: str, session: Optional['requests.Session'] = None,
+                 fixture_dir: Optional[str] = None, record: bool = False):
+        self.api_url = api_url
+        self.title = title
+        if session is None:
+            from http_client import shared_session
+            session = shared_session()
+        self.session = session
+        # With fixture_dir, responses are replayed from it (or recorded to it when record=True)
+        self.fixture_dir = fixture_dir
+        self.record = record
+
+    @classmethod
+    def from_page_url(cls, url: str, **kwargs) -> 'MediaWikiSource':
+        """Build the source for a /wiki/<title> page URL."""
+        parsed = urlparse(url)
+        title = unquote(parsed.path.split('/wiki/', 1)[1])
+        return cls(f"{parsed.scheme}://{parsed.netloc}/w/api.php", title, **kwargs)
+
+    def _fixture_path(self, params: Dict[str, str]) -> str:
+        name = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.fixture_dir, f"{name}.json")
+
+    def _request(self, params: Dict[str, str]) -> dict:
+        params = dict(params, format='json', formatversion='2')
+        if self.fixture_dir and not self.record:
+            with open(self._fixture_path(params), 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        response = self.session.get(self.api_url, params=params, timeout=30)
+        response.raise_for_status()
+        data = response.json()
+        if 'error' in data:
+            raise RuntimeError(f"MediaWiki API error: {data['error']}")
+
+        if self.fixture_dir and self.record:
+            os.makedirs(self.fixture_dir, exist_ok=True)
+            with open(self._fixture_path(params), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        return data
+
+    def fetch_wikitext(self) -> str:
+        """Return the page's wikitext."""
+        data = self._request({'action': 'parse', 'page': self.title, 'prop': 'wikitext', 'redirects': '1'})
+        return data['parse']['wikitext']
+
+    def iter_link_titles(self) -> Iterator[str]:
+        """Yield the titles of the page's main-namespace links, following API continuation."""
+        params = {'action': 'query', 'titles': self.title, 'prop': 'links',
+                  'plnamespace': '0', 'pllimit': 'max', 'redirects': '1'}
+        while True:
+            data = self._request(params)
+            for page in data.get('query', {}).get('pages', []):
+                for link in page.get('links', []):
+                    yield link['title']
+            if 'continue' not in data:
+                break
+            params = dict(params, **data['continue'])
+
+    def extract_all_rules(self, use_links_api: bool = False) -> List[str]:
+        """Return the page's link texts, from the wikitext or from prop=links."""
+        if use_links_api:
+            rules = list(self.iter_link_titles())
+        else:
+            rules = parse_wikitext_links(self.fetch_wikitext())
+        print(f"Found {len(rules)} links through the MediaWiki API")
+        return rules
+
+
+def main(url: str = LAW_BOOK_URL, use_links_api: bool = False, fixture_dir: Optional[str] = None,
+         record: bool = False, out_path: str = 'law_related_texts_api.txt'):
+    source = MediaWikiSource.from_page_url(url, fixture_dir=fixture_dir, record=record)
+    rules = source.extract_all_rules(use_links_api=use_links_api)
+
+    with open(out_path, 'w', encoding='utf-8') as f:
+        for i, text in enumerate(rules, 1):
+            f.write(f"{i}. {text}\n")
+    print(f"✓ Saved {len(rules)} texts to '{out_path}'")
+    return rules
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract the law book links through the MediaWiki API.")
+    parser.add_argument('--url', default=LAW_BOOK_URL, help="Page URL of the law book")
+    parser.add_argument('--links-api', action='store_true', help="Use prop=links instead of parsing the wikitext")
+    parser.add_argument('--fixtures', default=None, help="Replay API responses from this directory")
+    parser.add_argument('--record', action='store_true', help="Record API responses into --fixtures")
+    parser.add_argument('--out', default='law_related_texts_api.txt', help="Output text file")
+    args = parser.parse_args()
+    main(args.url, use_links_api=args.links_api, fixture_dir=args.fixtures, record=args.record, out_path=args.out)
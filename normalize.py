@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Normalization of Hebrew law titles, shared by all comparison scripts.
+
+All patterns are compiled once at import time. The system rule cleanup of
+compare.py shares the "[נוסח ...]" removal between its two suffix variants,
+and the batch functions normalize whole lists with map() instead of a Python
+loop per title. Run this module to print the throughput per 10k titles.
+"""
+
+from functools import partial
+from typing import Callable, Iterable, List, Tuple
+import re
+
+_NON_KEY_CHARS = re.compile(r'[^a-zA-Zא-ת0-9]+')
+_NEW_MARKER = re.compile(r'\(\s*החדשות\s*\)')
+_VERSION_BLOCK = re.compile(r'[\[(]נוסח [^\])]*[\])]')
+_SQUARE_VERSION_BLOCK = re.compile(r'\[נוסח [^\]]*\]')
+# Any trailing Hebrew word followed by a number, e.g. "תשנ"ה-1995"
+_GENERIC_YEAR_SUFFIX = re.compile(r'[^\(\)[\]\{\}a-zA-Zא-ת0-9]*[א-ת"׳]+\s*([-–]\s*)?\d{2,6}[^\(\)[\]\{\}a-zA-Zא-ת0-9]*$')
+# A trailing Hebrew year, e.g. "התשנ"ה-1995"
+_HEBREW_YEAR_SUFFIX = re.compile(r'[^\(\)[\]\{\}a-zA-Zא-ת0-9]*[ה]?תש([\'"״”]+|.[\'"״”]+)[^\(\)]+\d+[^\(\)[\]\{\}a-zA-Zא-ת0-9]*$')
+_COMMA_YEAR_SUFFIX = re.compile(r',\s*\d{4}$')
+_LOOSE_PUNCTUATION = re.compile(r'["\'\(\)\[\]\{\}]+')
+
+_delete_non_key_chars = partial(_NON_KEY_CHARS.sub, '')
+
+
+def clean_key(text: str) -> str:
+    """Strip everything but Latin/Hebrew letters and digits for fuzzy comparison."""
+    return _NON_KEY_CHARS.sub('', text)
+
+
+def clean_keys(texts: Iterable[str]) -> List[str]:
+    """Batch version of clean_key."""
+    return list(map(_delete_non_key_chars, texts))
+
+
+def clean_wiki_title(text: str) -> str:
+    """Drop the "(החדשות)" marker of a wiki title."""
+    return _NEW_MARKER.sub('', text).strip()
+
+
+def clean_wiki_titles(texts: Iterable[str]) -> List[str]:
+    """Batch version of clean_wiki_title."""
+    return [_NEW_MARKER.sub('', text).strip() for text in texts]
+
+
+def strip_system_suffixes(text: str) -> Tuple[str, str]:
+    """Return the two suffix-stripped variants of a system rule used by compare.py.
+
+    The first drops any trailing "<word> <number>" suffix, the second only a
+    Hebrew year or a ", 1234" suffix. Both drop the "[נוסח ...]" block, which
+    is removed once and shared.
+    """
+    text = _VERSION_BLOCK.sub('', text)
+    generic = _GENERIC_YEAR_SUFFIX.sub('', text)
+    hebrew_year = _COMMA_YEAR_SUFFIX.sub('', _HEBREW_YEAR_SUFFIX.sub('', text))
+    return generic, hebrew_year
+
+
+def strip_system_suffixes_many(texts: Iterable[str]) -> List[Tuple[str, str]]:
+    """Batch version of strip_system_suffixes."""
+    return list(map(strip_system_suffixes, texts))
+
+
+def clean_comma_suffixed_key(text: str) -> str:
+    """Comparison key of compare_fast.py: drop everything after the last comma and the version block."""
+    text = text.rsplit(',', 1)[0]
+    return _NON_KEY_CHARS.sub('', _SQUARE_VERSION_BLOCK.sub('', text))
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for comparison by removing extra spaces and some punctuation but keeping structure."""
+    # Remove only specific punctuation that might vary, then collapse and trim whitespace
+    return ' '.join(_LOOSE_PUNCTUATION.sub('', text).split()).lower()
+
+
+def normalize_many(texts: Iterable[str], normalizer: Callable[[str], str] = clean_key) -> List[str]:
+    """Apply a normalizer to a whole list of titles."""
+    if normalizer is clean_key:
+        return clean_keys(texts)
+    return list(map(normalizer, texts))
+
+
+def _benchmark(size: int = 10000, repeat: int = 5):
+    """Print the time per 10k titles of every normalizer."""
+    import timeit
+
+    samples = [
+        'חוק הגנת הצרכן, התשמ"א-1981',
+        'פקודת מס הכנסה [נוסח חדש]',
+        'חוק לתיקון דיני העונשין (החדשות) (תיקון מס\' 4), התשנ"ה-1995',
+        'תקנות התעבורה, 1961',
+        'חוק-יסוד: כבוד האדם וחירותו',
+    ]
+    titles = [f"{samples[i % len(samples)]} {i}" if i % 7 == 0 else samples[i % len(samples)]
+              for i in range(size)]
+
+    for name, normalizer in [('clean_keys', clean_keys),
+                             ('clean_wiki_titles', clean_wiki_titles),
+                             ('strip_system_suffixes_many', strip_system_suffixes_many),
+                             ('clean_comma_suffixed_key', partial(normalize_many, normalizer=clean_comma_suffixed_key)),
+                             ('normalize_text', partial(normalize_many, normalizer=normalize_text))]:
+        seconds = min(timeit.repeat(lambda: normalizer(titles), number=1, repeat=repeat))
+        print(f"{name:28s} {seconds * 10000 / size * 1000:8.2f} ms per 10k titles "
+              f"({size / seconds:,.0f} titles/s)")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-core helpers for the wiki-vs-system comparison scripts.
+
+The lookup state (e.g. a FuzzyMatcher over the system rules) is built once
+in every worker process by the pool initializer, so only the list chunks
+are sent per task. Results come back in input order, which keeps the
+reports identical to a serial run. Instrumentation counters collected in
+the workers are merged into the parent's. WorkerPool keeps the workers (and
+their state) alive across several maps, e.g. one per batch of a chunked run.
+"""
+
+from typing import Any, Callable, List, Optional, Sequence
+
+from instrumentation import metrics
+
+# Lookup state of the current worker process, set by _init_worker
+_worker_state = None
+
+
+def _init_worker(build_state: Callable, state_args: tuple):
+    global _worker_state
+    _worker_state = build_state(*state_args)
+
+
+def _run_chunk(func: Callable, chunk: Sequence):
+    # The counters of the chunk go back with its results, to be merged in the parent
+    metrics.counters.clear()
+    results = [func(_worker_state, item) for item in chunk]
+    return results, dict(metrics.counters)
+
+
+class WorkerPool:
+    """Lookup state built once, in this process or in every worker, for several maps."""
+
+    def __init__(self, build_state: Callable, state_args: tuple = (), workers: int = 1):
+        self.workers = workers
+        self.state = None
+        self.executor = None
+        if workers <= 1:
+            self.state = build_state(*state_args)
+        else:
+            # Only multi-process runs pay for importing multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                initargs=(build_state, state_args))
+
+    def map(self, func: Callable[[Any, Any], Any], items: Sequence, chunk_size: Optional[int] = None) -> List:
+        """Return [func(state, item) for item in items]; func must be a module-level function."""
+        if self.executor is None:
+            return [func(self.state, item) for item in items]
+
+        if chunk_size is None:
+            # A few chunks per worker evens out slow chunks without much overhead
+            chunk_size = max(1, -(-len(items) // (self.workers * 4)))
+        chunks = [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+        results = []
+        # map() yields in submission order, so the merge is deterministic
+        for chunk_results, chunk_counters in self.executor.map(_run_chunk, [func] * len(chunks), chunks):
+            results.extend(chunk_results)
+            metrics.merge_counters(chunk_counters)
+        return results
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def parallel_map(func: Callable[[Any, Any], Any], items: Sequence, build_state: Callable,
+                 state_args: tuple = (), workers: int = 1, chunk_size: int = None) -> List:
+    """Return [func(state, item) for item in items], where state = build_state(*state_args).
+
+    With workers > 1 the items are split into chunks and processed by a
+    ProcessPoolExecutor; func and build_state must be module-level functions.
+    """
+    if len(items) < 2:
+        workers = 1
+    with WorkerPool(build_state, state_args, workers) as pool:
+        return pool.map(func, items, chunk_size)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Streaming report output for the comparison scripts.
+
+Rows are written as they come instead of being collected into a pandas
+DataFrame first. Excel files are written by xlsxwriter in constant_memory
+mode, which flushes every finished row to disk; CSV, JSON Lines and Parquet
+are also supported. The writer libraries are only imported for the format
+actually used, so the scripts no longer import pandas at all.
+
+A report may have several sheets. Excel keeps them in one workbook; the
+other formats write one file per sheet, named <stem>_<sheet><ext>, unless
+the report has a single sheet.
+"""
+
+import csv
+import json
+import os
+from typing import Iterable, List, Optional, Sequence
+
+from instrumentation import count, stage
+
+FORMATS = ('xlsx', 'csv', 'jsonl', 'parquet')
+PARQUET_BATCH_SIZE = 10000
+
+
+def report_path(path: str, fmt: Optional[str]) -> str:
+    """Return path with the extension of the given format (unchanged if fmt is None)."""
+    if fmt is None:
+        return path
+    return os.path.splitext(path)[0] + '.' + fmt
+
+
+class _XlsxSheet:
+    def __init__(self, workbook, name: str, columns: Sequence[str], header_format):
+        self.worksheet = workbook.add_worksheet(name)
+        self.worksheet.write_row(0, 0, columns, header_format)
+        self.next_row = 1
+
+    def write_row(self, row: Sequence):
+        self.worksheet.write_row(self.next_row, 0, row)
+        self.next_row += 1
+
+    def close(self):
+        pass
+
+
+class _CsvSheet:
+    def __init__(self, path: str, columns: Sequence[str]):
+        # utf-8-sig so Excel opens the Hebrew text correctly
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write_row(self, row: Sequence):
+        self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class _JsonLinesSheet:
+    def __init__(self, path: str, columns: Sequence[str]):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.columns = list(columns)
+
+    def write_row(self, row: Sequence):
+        self.file.write(json.dumps(dict(zip(self.columns, row)), ensure_ascii=False) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class _ParquetSheet:
+    def __init__(self, path: str, columns: Sequence[str]):
+        import pyarrow
+        import pyarrow.parquet
+        self.pyarrow = pyarrow
+        self.path = path
+        self.columns = list(columns)
+        self.batch: List[Sequence] = []
+        self.writer = None
+        self.schema = None
+
+    def _flush(self):
+        data = {column: [row[i] for row in self.batch] for i, column in enumerate(self.columns)}
+        table = self.pyarrow.table(data, schema=self.schema)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = self.pyarrow.parquet.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table)
+        self.batch = []
+
+    def write_row(self, row: Sequence):
+        self.batch.append(row)
+        if len(self.batch) >= PARQUET_BATCH_SIZE:
+            self._flush()
+
+    def close(self):
+        if self.batch or self.writer is None:
+            self._flush()
+        self.writer.close()
+
+
+class ReportWriter:
+    """Write report rows straight to an xlsx, csv, jsonl or parquet file."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None, single_sheet: bool = True):
+        self.path = path
+        self.fmt = fmt or os.path.splitext(path)[1].lstrip('.').lower()
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unsupported report format: {self.fmt}")
+        self.single_sheet = single_sheet
+        self.sheets = []
+        self.workbook = None
+        if self.fmt == 'xlsx':
+            import xlsxwriter
+            self.workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+            self.header_format = self.workbook.add_format({'bold': True, 'border': 1})
+
+    def _sheet_path(self, name: str) -> str:
+        if self.single_sheet:
+            return self.path
+        stem, ext = os.path.splitext(self.path)
+        return f"{stem}_{name.replace(' ', '_')}{ext}"
+
+    def add_sheet(self, name: str, columns: Sequence[str]):
+        """Start a sheet with a header row; rows go to the returned sheet's write_row()."""
+        if self.fmt == 'xlsx':
+            sheet = _XlsxSheet(self.workbook, name, columns, self.header_format)
+        elif self.fmt == 'csv':
+            sheet = _CsvSheet(self._sheet_path(name), columns)
+        elif self.fmt == 'jsonl':
+            sheet = _JsonLinesSheet(self._sheet_path(name), columns)
+        else:
+            sheet = _ParquetSheet(self._sheet_path(name), columns)
+        self.sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        for sheet in self.sheets:
+            sheet.close()
+        if self.workbook is not None:
+            self.workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def write_report(path: str, columns: Sequence[str], rows: Iterable[Sequence],
+                 fmt: Optional[str] = None, sheet_name: str = 'Sheet1') -> int:
+    """Write rows as a single-sheet report and return the number of rows written."""
+    written = 0
+    with stage('write'), ReportWriter(path, fmt) as writer:
+        sheet = writer.add_sheet(sheet_name, columns)
+        for row in rows:
+            sheet.write_row(row)
+            written += 1
+    count('report.rows', written)
+    return written
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Binary snapshots of the wiki and system rule lists.
+
+A snapshot is memory-mapped and loads without any HTML parsing or "*&*"
+splitting, so the compare scripts can run against it instead of the
+network (--wiki-snapshot / --system-snapshot).
+
+Layout (little-endian):
+
+    b'LAWSNAP1' | u32 header size | JSON header | padding to 8 bytes | sections
+
+The header names the kind ('wiki' or 'system'), the source URL, the row
+count and, per column, the (offset, size) of its sections relative to the
+first section. The only column is `text`: the wiki anchor texts or the raw
+system records, in order. Every script normalizes them itself, since each
+compares a different field with a different normalizer.
+
+A string column is an offsets array (u64, rows + 1 entries) plus a UTF-8
+blob of the values separated by NUL, so a range of rows is a slice of the
+blob and a whole column is decoded with a single split().
+
+The scripts read three different lawdata endpoints, so a system snapshot is
+only accepted by a script whose endpoint is the snapshot's source.
+"""
+
+import argparse
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+from typing import Iterable, Iterator, List, Optional
+
+MAGIC = b'LAWSNAP1'
+_SEPARATOR = '\x00'
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _string_sections(values: List[str]):
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = array('Q', [0])
+    position = 0
+    for value in encoded:
+        # Every value is followed by one separator byte
+        position += len(value) + 1
+        offsets.append(position)
+    blob = _SEPARATOR.encode('utf-8').join(encoded)
+    return _little_endian(offsets), blob
+
+
+def _align(size: int) -> int:
+    return (size + 7) // 8 * 8
+
+
+def write_snapshot(path: str, texts: Iterable[str], kind: str, source: str = '') -> int:
+    """Write the texts of a 'wiki' or 'system' list as a snapshot and return the row count."""
+    if kind not in ('wiki', 'system'):
+        raise ValueError(f"Unknown snapshot kind: {kind}")
+    texts = list(texts)
+    if any(_SEPARATOR in text for text in texts):
+        raise ValueError("Snapshot texts must not contain NUL characters")
+
+    sections = []
+    columns = {}
+    position = 0
+
+    def add_section(data: bytes):
+        nonlocal position
+        sections.append(data + b'\x00' * (_align(len(data)) - len(data)))
+        start = position
+        position += _align(len(data))
+        return [start, len(data)]
+
+    offsets, blob = _string_sections(texts)
+    columns['text'] = {'type': 'str', 'offsets': add_section(offsets), 'data': add_section(blob)}
+
+    header = json.dumps({'kind': kind, 'source': source, 'created_at': time.time(),
+                         'count': len(texts), 'columns': columns}, ensure_ascii=False).encode('utf-8')
+    prefix = MAGIC + len(header).to_bytes(4, 'little') + header
+    with open(path + '.tmp', 'wb') as f:
+        f.write(prefix + b'\x00' * (_align(len(prefix)) - len(prefix)))
+        for section in sections:
+            f.write(section)
+    # Readers never see a half-written snapshot
+    os.replace(path + '.tmp', path)
+    return len(texts)
+
+
+class Snapshot:
+    """Memory-mapped snapshot; columns are decoded on request."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self._map.close()
+            raise ValueError(f"Not a rules snapshot: {path}")
+        header_size = int.from_bytes(self._map[len(MAGIC):len(MAGIC) + 4], 'little')
+        header_end = len(MAGIC) + 4 + header_size
+        self.header = json.loads(self._map[len(MAGIC) + 4:header_end].decode('utf-8'))
+        self._base = _align(header_end)
+        self.kind: str = self.header['kind']
+        self.source: str = self.header['source']
+        self.count: int = self.header['count']
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _section(self, column: str, part: str = 'data') -> memoryview:
+        start, size = self.header['columns'][column][part]
+        return memoryview(self._map)[self._base + start:self._base + start + size]
+
+    def column(self, name: str) -> List[str]:
+        """Return a whole string column as a list."""
+        if self.count == 0:
+            return []
+        return str(self._section(name), 'utf-8').split(_SEPARATOR)
+
+    def check(self, kind: str, source: Optional[str] = None):
+        """Raise ValueError unless this is a `kind` snapshot of `source` (when given)."""
+        if self.kind != kind:
+            raise ValueError(f"{self.path} is a {self.kind} snapshot, expected {kind}")
+        if source is None:
+            return
+        if not self.source:
+            print(f"Warning: {self.path} does not record its source, assuming {source}")
+        elif self.source != source:
+            raise ValueError(f"{self.path} is a snapshot of {self.source}, expected {source}")
+
+    def iter_batches(self, name: str, batch_size: int) -> Iterator[List[str]]:
+        """Yield a string column in lists of up to batch_size rows, decoding one range at a time."""
+        offsets = self._section(name, 'offsets').cast('Q')
+        data = self._section(name)
+        data_start = self._base + self.header['columns'][name]['data'][0]
+        try:
+            for start in range(0, self.count, batch_size):
+                end = min(start + batch_size, self.count)
+                yield str(data[offsets[start]:offsets[end] - 1], 'utf-8').split(_SEPARATOR)
+                self._drop_pages(data_start + offsets[start], data_start + offsets[end])
+        finally:
+            # The map cannot be closed while views of it are alive
+            offsets.release()
+            data.release()
+
+    def _drop_pages(self, start: int, end: int):
+        # Let the OS drop the pages of a consumed range, so a streamed read keeps RSS flat
+        if not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        start = start // mmap.PAGESIZE * mmap.PAGESIZE
+        end = end // mmap.PAGESIZE * mmap.PAGESIZE
+        if end > start:
+            self._map.madvise(mmap.MADV_DONTNEED, start, end - start)
+
+    def texts(self) -> List[str]:
+        return self.column('text')
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_texts(path: str, kind: str, source: Optional[str] = None) -> List[str]:
+    """Return the texts of a snapshot, checking that it holds the expected kind of list (and source)."""
+    with Snapshot(path) as snapshot:
+        snapshot.check(kind, source)
+        texts = snapshot.texts()
+    print(f"Loaded {len(texts)} {kind} texts from snapshot '{path}'")
+    return texts
+
+
+def iter_text_batches(path: str, kind: str, batch_size: int, source: Optional[str] = None) -> Iterator[List[str]]:
+    """Yield the texts of a snapshot in lists of up to batch_size, checked like read_texts()."""
+    with Snapshot(path) as snapshot:
+        snapshot.check(kind, source)
+        print(f"Streaming {len(snapshot)} {kind} texts from snapshot '{path}'")
+        yield from snapshot.iter_batches('text', batch_size)
+
+
+def add_snapshot_arguments(parser):
+    """Add the --wiki-snapshot / --system-snapshot options to an argparse parser."""
+    parser.add_argument('--wiki-snapshot', default=None,
+                        help="Read the wiki law texts from this snapshot instead of the wiki")
+    parser.add_argument('--system-snapshot', default=None,
+                        help="Read the system records from this snapshot instead of the lawdata endpoint")
+
+
+def main(command: str, out_path: Optional[str] = None, url: Optional[str] = None, cache=None,
+         streaming: bool = False):
+    if command == 'info':
+        with Snapshot(out_path) as snapshot:
+            print(json.dumps(dict(snapshot.header, size=os.path.getsize(out_path)), ensure_ascii=False, indent=2))
+        return
+
+    if command == 'wiki':
+        from extract_rules import LAW_BOOK_URL, extract_all_rules
+        texts = extract_all_rules(cache, streaming=streaming)
+        source = LAW_BOOK_URL
+    else:
+        from system_rules import SystemRulesClient
+        from compare import SYSTEM_RULES_URL
+        source = url or SYSTEM_RULES_URL
+        texts = list(SystemRulesClient(source, cache=cache).iter_records())
+    count = write_snapshot(out_path, texts, command, source)
+    print(f"✓ Saved {count} {command} texts to snapshot '{out_path}'")
+
+
+if __name__ == "__main__":
+    from http_cache import add_cache_arguments, cache_from_args
+
+    parser = argparse.ArgumentParser(description="Write or inspect snapshots of the wiki and system rule lists.")
+    parser.add_argument('command', choices=('wiki', 'system', 'info'),
+                        help="Snapshot the wiki law texts or a system endpoint, or print a snapshot's header")
+    parser.add_argument('path', help="Snapshot file")
+    parser.add_argument('--url', default=None,
+                        help="System endpoint (default: the compare.py endpoint); a system snapshot is only "
+                             "accepted by the scripts reading the same endpoint")
+    parser.add_argument('--streaming', action='store_true', help="Parse the wiki page while it downloads")
+    add_cache_arguments(parser)
+    args = parser.parse_args()
+    main(args.command, args.path, url=args.url, cache=cache_from_args(args), streaming=args.streaming)
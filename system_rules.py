@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Parsed records for the lawdata "*&*" / "*^*" rule payloads.
+"""
+
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, NamedTuple, Optional
+from instrumentation import stage
+from normalize import clean_key
+
+if TYPE_CHECKING:
+    import requests
+
+RECORD_SEPARATOR = '*&*'
+FIELD_SEPARATOR = '*^*'
+
+
+class SystemRule(NamedTuple):
+    """A single system rule, split and normalized once per fetch."""
+    raw: str
+    rule_id: str
+    name: str
+    key: str
+
+
+def parse_system_rule(record: str, name_field: Optional[int] = 1,
+                      normalize: Callable[[str], str] = clean_key) -> Optional[SystemRule]:
+    """Parse one "*^*"-separated record.
+
+    With name_field=None the whole record is used as the name. Returns None
+    when the record does not have the requested name field.
+    """
+    if name_field is None:
+        return SystemRule(record, '', record, normalize(record))
+
+    fields = record.split(FIELD_SEPARATOR)
+    if len(fields) <= name_field:
+        return None
+    return SystemRule(record, fields[0], fields[name_field], normalize(fields[name_field]))
+
+
+def parse_system_rules(records: Iterable[str], name_field: Optional[int] = 1,
+                       normalize: Callable[[str], str] = clean_key) -> List[SystemRule]:
+    """Parse records, skipping the ones without the requested name field."""
+    rules = []
+    for record in records:
+        rule = parse_system_rule(record, name_field, normalize)
+        if rule is not None:
+            rules.append(rule)
+    return rules
+
+
+def iter_records(chunks: Iterable[str], separator: str = RECORD_SEPARATOR) -> Iterator[str]:
+    """Yield the records of a chunked payload; the same pieces as ''.join(chunks).split(separator).
+
+    Only the unfinished tail of the payload is buffered, so a separator split
+    across two chunks is still found.
+    """
+    tail = ''
+    for chunk in chunks:
+        pieces = (tail + chunk).split(separator)
+        tail = pieces.pop()
+        yield from pieces
+    yield tail
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Yield lists of up to size consecutive items."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class SystemRulesClient:
+    """Stream the records of a lawdata rules endpoint."""
+
+    def __init__(self, url: str, session: Optional['requests.Session'] = None,
+                 cache=None, chunk_size: int = 64 * 1024):
+        self.url = url
+        if session is None:
+            from http_client import shared_session
+            session = shared_session()
+        self.session = session
+        # Optional http_cache.HttpCache; cached bodies are replayed in chunks
+        self.cache = cache
+        self.chunk_size = chunk_size
+
+    def iter_chunks(self) -> Iterator[str]:
+        """Yield the decoded response body in chunks as it downloads."""
+        if self.cache is not None:
+            yield from self.cache.iter_text(self.url, self.session, chunk_size=self.chunk_size)
+            return
+
+        with self.session.get(self.url, timeout=60, stream=True) as response:
+            response.raise_for_status()
+            response.encoding = 'utf-8'  # Ensure proper Hebrew encoding
+            yield from response.iter_content(chunk_size=self.chunk_size, decode_unicode=True)
+
+    def iter_records(self) -> Iterator[str]:
+        """Yield the raw "*&*"-separated records, including empty ones."""
+        return iter_records(self.iter_chunks())
+
+    def iter_batches(self, batch_size: int) -> Iterator[List[str]]:
+        """Yield the raw records in lists of up to batch_size, holding one list at a time."""
+        return batched(self.iter_records(), batch_size)
+
+    def iter_rules(self, name_field: Optional[int] = 1, normalize: Callable[[str], str] = clean_key,
+                   preprocess: Optional[Callable[[str], str]] = None) -> Iterator[SystemRule]:
+        """Yield parsed SystemRule records, skipping the ones without the name field."""
+        for record in self.iter_records():
+            if preprocess is not None:
+                record = preprocess(record)
+            rule = parse_system_rule(record, name_field, normalize)
+            if rule is not None:
+                yield rule
+
+
+def fetch_records(url: str, cache=None, snapshot: Optional[str] = None) -> List[str]:
+    """Return the raw records of a lawdata endpoint, or of a system snapshot (snapshot.py) of it."""
+    print("\n=== Fetching System Rules ===")
+    with stage('system.fetch'):
+        if snapshot:
+            from snapshot import read_texts
+            return read_texts(snapshot, 'system', url)
+        # Stream the records instead of holding the whole body and its split copy
+        return list(SystemRulesClient(url, cache=cache).iter_records())
+
+
+def fetch_rules(url: str, cache=None, snapshot: Optional[str] = None, name_field: Optional[int] = 1,
+                normalize: Callable[[str], str] = clean_key,
+                preprocess: Optional[Callable[[str], str]] = None) -> List[SystemRule]:
+    """Like fetch_records(), but parse every record as it arrives (see SystemRulesClient.iter_rules)."""
+    print("\n=== Fetching System Rules ===")
+    with stage('system.fetch'):
+        if snapshot:
+            from snapshot import read_texts
+            records = read_texts(snapshot, 'system', url)
+            if preprocess is not None:
+                records = map(preprocess, records)
+            return parse_system_rules(records, name_field, normalize)
+        return list(SystemRulesClient(url, cache=cache).iter_rules(name_field, normalize, preprocess))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LawBookCrawler against a local stub of the law book pages.
+
+Run with: python -m pytest test_crawler.py (or python -m unittest test_crawler)
+"""
+
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from crawler import LawBookCrawler
+
+CATEGORY_PATH = '/wiki/' + quote('קטגוריה:חוקים')
+
+PAGES = {
+    '/wiki/Book': [
+        ('/wiki/Book/A', 'חוק א'),
+        ('/wiki/Book/Missing', 'חוק חסר'),
+        ('https://example.org/wiki/Book/Elsewhere', 'קישור חיצוני'),
+        ('/wiki/Book/B#section', 'חוק ב'),
+        (CATEGORY_PATH, 'קטגוריה'),
+        ('/wiki/Book/A', 'חוק א'),
+        ('/wiki/Other', 'דף אחר'),
+    ],
+    '/wiki/Book/A': [('/wiki/A1', 'תקנות א'), ('/wiki/A2', 'חוק ב')],
+    '/wiki/Book/B': [('/wiki/B1', 'פקודת ב'), ('/wiki/A1', 'תקנות א')],
+    CATEGORY_PATH: [('/wiki/C1', 'צו ג')],
+}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        links = PAGES.get(self.path)
+        if links is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = ('<html><body>' + ''.join(f'<a href="{href}">{text}</a>' for href, text in links)
+                + '</body></html>').encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LawBookCrawlerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_collect_links_keeps_law_book_pages_in_order(self):
+        crawler = LawBookCrawler(self.base + '/wiki/Book', rate=0)
+        anchors = [(text, href) for href, text in PAGES['/wiki/Book']]
+        self.assertEqual(crawler.collect_links(anchors), [
+            self.base + '/wiki/Book/A',
+            self.base + '/wiki/Book/Missing',
+            self.base + '/wiki/Book/B',
+            self.base + CATEGORY_PATH,
+        ])
+
+    def test_crawl_merges_pages_and_skips_the_missing_one(self):
+        crawler = LawBookCrawler(self.base + '/wiki/Book', max_workers=4, rate=0)
+        self.assertEqual(crawler.crawl(), [
+            # The index page, then the linked pages in link order; repeated texts are kept once
+            'חוק א', 'חוק חסר', 'קישור חיצוני', 'חוק ב', 'קטגוריה', 'דף אחר',
+            'תקנות א',
+            'פקודת ב',
+            'צו ג',
+        ])
+
+    def test_crawl_without_categories(self):
+        crawler = LawBookCrawler(self.base + '/wiki/Book', rate=0, include_categories=False)
+        self.assertNotIn('צו ג', crawler.crawl())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MatchService and its JSON API against a local stub of the system rules endpoint.
+
+Run with: python -m pytest test_match_server.py (or python -m unittest test_match_server)
+"""
+
+import json
+import threading
+import time
+import unittest
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+from match_server import MatchService, make_server
+
+RECORDS = [
+    '1*^*x*^*חוק הגנת הצרכן, התשמ"א-1981',
+    '2*^*x*^*פקודת המכס',
+    # No name field, skipped
+    '3*^*x',
+]
+NEW_RECORD = '4*^*x*^*חוק חדש לגמרי'
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = '*&*'.join(self.server.records).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MatchServerTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.stub.daemon_threads = True
+        cls.stub.records = list(RECORDS)
+        threading.Thread(target=cls.stub.serve_forever, daemon=True).start()
+
+        cls.service = MatchService(f'http://127.0.0.1:{cls.stub.server_address[1]}/rules', reload_interval=0.1)
+        cls.service.start()
+        cls.server = make_server(cls.service, port=0)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.service.stop()
+        for server in (cls.server, cls.stub):
+            server.shutdown()
+            server.server_close()
+
+    def request(self, path, body=None):
+        """Return (status, JSON payload) of a GET, or of a POST of the raw body."""
+        request = urllib.request.Request(self.base + path, body, {'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read())
+
+    def test_single_lookup(self):
+        status, result = self.request('/lookup?title=' + quote('חוק הגנת הצרכן, התשמ"א-1981 (החדשות)'))
+        self.assertEqual(status, 200)
+        self.assertTrue(result['in_system'])
+        self.assertEqual(result['rule']['id'], '1')
+
+        status, result = self.request('/lookup?title=' + quote('חוק שאינו במערכת'))
+        self.assertEqual((status, result['in_system'], result['rule']), (200, False, None))
+
+    def test_single_lookup_without_title(self):
+        status, result = self.request('/lookup')
+        self.assertEqual(status, 400)
+
+    def test_batch_lookup_keeps_the_order(self):
+        titles = ['פקודת המכס', 'חוק שאינו במערכת', 'חוק הגנת הצרכנ, התשמ"א-1981']
+        status, result = self.request('/lookup', json.dumps({'titles': titles}).encode('utf-8'))
+        self.assertEqual(status, 200)
+        self.assertEqual([item['title'] for item in result['results']], titles)
+        self.assertEqual([item['in_system'] for item in result['results']], [True, False, True])
+
+    def test_bad_batch_bodies(self):
+        for body in (b'{', b'[1]', b'"x"', b'null', b'{}', b'{"titles": "x"}', b'{"titles": [1]}'):
+            with self.subTest(body=body):
+                status, result = self.request('/lookup', body)
+                self.assertEqual(status, 400)
+                self.assertIn('error', result)
+
+    def test_background_reload_picks_up_changed_rules(self):
+        status, result = self.request('/lookup?title=' + quote(NEW_RECORD.split('*^*')[-1]))
+        self.assertFalse(result['in_system'])
+        version = self.request('/health')[1]['version']
+
+        self.stub.records.append(NEW_RECORD)
+        try:
+            deadline = time.time() + 10
+            while self.request('/health')[1]['version'] == version and time.time() < deadline:
+                time.sleep(0.05)
+            status, health = self.request('/health')
+            self.assertEqual(health['rules'], 3)
+            status, result = self.request('/lookup?title=' + quote(NEW_RECORD.split('*^*')[-1]))
+            self.assertTrue(result['in_system'])
+        finally:
+            self.stub.records.remove(NEW_RECORD)
+
+
+if __name__ == "__main__":
+    unittest.main()